@@ -128,6 +128,14 @@ def init_database():
                 else:
                     print(f"\nℹ️  Demo user already exists: {demo_email}")
                 
+                # ========================================
+                # BACKFILL MONTHLY STATISTICS ROLLUP
+                # ========================================
+                print("\n📈 Rebuilding monthly expense statistics...")
+                from backend.services.expense_service import expense_service
+                result = expense_service.rebuild_monthly_stats()
+                print(("✅ " if result['success'] else "❌ ") + result['message'])
+                
                 # ========================================
                 # DISPLAY DATABASE STATISTICS
                 # ========================================
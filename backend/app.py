@@ -10,6 +10,9 @@ from flask_jwt_extended import JWTManager
 from backend.config import config
 from backend.utils.db_connection import db
 from backend.utils.logger import setup_logger, setup_request_logging, setup_error_logging
+from backend.utils.json_provider import OrjsonProvider
+from backend.utils.jwt_utils import clear_current_user_id
+import logging
 import os
 
 
@@ -22,6 +25,7 @@ def create_app(config_name=None):
 
     # Create Flask app
     app = Flask(__name__)
+    app.json = OrjsonProvider(app)
 
     # Load configuration
     app.config.from_object(config[config_name])
@@ -218,6 +222,7 @@ def create_app(config_name=None):
                 "Savings Goals": {
                     "POST /savings/": "Create savings goal",
                     "GET /savings/": "List savings goals",
+                    "GET /savings/summary": "Get savings goals summary",
                     "GET /savings/<id>": "Get goal by ID",
                     "PUT /savings/<id>": "Update goal",
                     "DELETE /savings/<id>": "Delete goal",
@@ -227,7 +232,8 @@ def create_app(config_name=None):
                     "GET /ml/forecast": "Get 30-day expense forecast",
                     "GET /ml/anomalies": "Detect spending anomalies",
                     "GET /ml/insights": "Get spending insights",
-                    "GET /ml/financial-health": "Calculate financial health score"
+                    "GET /ml/financial-health": "Calculate financial health score",
+                    "GET /ml/predict-next": "Predict next expense amount"
                 }
             }
         })
@@ -269,8 +275,8 @@ def create_app(config_name=None):
         from flask import request
         
         # Log request if not health check
-        if request.path != '/health':
-            app.logger.debug(f'Request: {request.method} {request.path}')
+        if request.path != '/health' and app.logger.isEnabledFor(logging.DEBUG):
+            app.logger.debug('Request: %s %s', request.method, request.path)
     
     @app.after_request
     def after_request(response):
@@ -285,6 +291,9 @@ def create_app(config_name=None):
         
         return response
     
+    # g outlives the request when callers share one app context
+    app.teardown_request(clear_current_user_id)
+    
     # -------------------------------------------------------
     # ✅ NEW: Graceful Shutdown Handler
     # -------------------------------------------------------
@@ -37,7 +37,8 @@ def init_database():
             
             # Create indexes
             print("📊 Creating indexes...")
-            db._create_indexes()
+            db._create_indexes(force=True)
+            db.drop_legacy_indexes()
             
             # Get collections
             users = db.get_collection('users')
@@ -117,6 +118,12 @@ def init_database():
             else:
                 print("ℹ️  Demo user already exists")
             
+            # Backfill the monthly statistics rollup
+            print("📈 Rebuilding monthly expense statistics...")
+            from backend.services.expense_service import expense_service
+            result = expense_service.rebuild_monthly_stats()
+            print(("✅ " if result['success'] else "❌ ") + result['message'])
+            
             # Display stats
             print("\n📊 Database Statistics:")
             stats = db.get_stats()
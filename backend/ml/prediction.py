@@ -0,0 +1,241 @@
+"""
+Prediction Module - Lightweight next-expense heuristics
+"""
+
+import numpy as np
+from array import array
+from functools import lru_cache, partial
+from math import fsum, isfinite, isnan
+from operator import is_not, methodcaller
+from typing import Dict, List, Tuple
+
+try:
+    from numba import njit, prange
+except ImportError:  # pragma: no cover - numba is optional
+    njit = None
+
+
+if njit is not None:
+    @njit(cache=True, fastmath=True)
+    def _sum_row(row):
+        """Sum of one window with a plain loop"""
+        total = 0.0
+        for value in row:
+            total += value
+        return total
+    
+    @njit(cache=True, parallel=True)
+    def _sum_rows(windows):
+        """Per-row sums, rows spread across threads"""
+        out = np.empty(windows.shape[0], dtype=np.float64)
+        for i in prange(windows.shape[0]):
+            out[i] = _sum_row(windows[i])
+        return out
+else:
+    def _sum_rows(windows):
+        """Per-row sums in one NumPy reduction"""
+        return windows.sum(axis=1)
+
+
+# C-level helpers for the general path; entries may lack an amount, so
+# dict.get is used rather than itemgetter
+_get_amount = methodcaller("get", "amount")
+_is_present = partial(is_not, None)
+
+
+def _round_cents(value: float) -> float:
+    """Round to whole cents, halves away from zero, in integer arithmetic"""
+    if not isfinite(value):
+        raise ValueError(f"cannot round non-finite amount {value!r}")
+    
+    return int(value * 100 + (0.5 if value >= 0 else -0.5)) / 100
+
+
+@lru_cache(maxsize=4096)
+def _avg_last5(amounts: Tuple[float, ...]) -> float:
+    """Average of a window of amounts, memoized on the window itself"""
+    return fsum(amounts) / len(amounts)
+
+
+def _predict_full5(history: List[Dict]) -> float:
+    """
+    Last-5 average for histories with at least five complete entries
+    
+    Unrolled; raises KeyError, TypeError or ValueError when an amount is
+    missing or NaN so the caller can fall back to the general path.
+    """
+    a = float(history[-1]["amount"])
+    b = float(history[-2]["amount"])
+    c = float(history[-3]["amount"])
+    d = float(history[-4]["amount"])
+    e = float(history[-5]["amount"])
+    if isnan(a) or isnan(b) or isnan(c) or isnan(d) or isnan(e):
+        raise ValueError("NaN amount in window")
+    
+    # Fixed payments (rent, subscriptions) repeat the same amount
+    if a == b == c == d == e:
+        return _round_cents(a)
+    
+    return _round_cents(fsum((a, b, c, d, e)) / 5)
+
+
+def heuristic_predict_last5_avg(history: List[Dict]) -> float:
+    """
+    Predict the next expense as the average of the last 5 amounts
+    
+    Takes the last up to 5 entries, coerces amounts to float and
+    returns the average rounded to 2 decimals. Entries whose amount is
+    missing, None or NaN are skipped rather than counted as 0 (nanmean
+    semantics).
+    
+    Raises:
+        ValueError: If history is not a non-empty list, or no entry in
+            the window has an amount
+    """
+    # Common case once a user has five transactions
+    if type(history) is list and len(history) >= 5:
+        try:
+            return _predict_full5(history)
+        except (KeyError, TypeError, ValueError):
+            pass
+    
+    if not history:
+        raise ValueError("history must be a non-empty list")
+    
+    # Dashboards re-ask for the same unchanged window, so the window's
+    # amounts are the cache key. Non-list input fails here instead of
+    # being type-checked up front.
+    try:
+        amounts = map(float, filter(_is_present, map(_get_amount, history[-5:])))
+        key = tuple(amount for amount in amounts if not isnan(amount))
+    except (AttributeError, KeyError, TypeError):
+        raise ValueError("history must be a non-empty list") from None
+    if not key:
+        raise ValueError("no amounts in the last 5 history entries")
+    
+    return _round_cents(_avg_last5(key))
+
+
+def heuristic_predict_last5_avg_arr(amounts: np.ndarray) -> float:
+    """
+    heuristic_predict_last5_avg for an amounts column
+    
+    Takes a 1-D float64 array of amounts (oldest first) instead of a list
+    of dicts, so no per-entry dict lookups or float conversions happen.
+    
+    NaN entries are skipped, as in heuristic_predict_last5_avg.
+    
+    Raises:
+        ValueError: If amounts is empty or the window is all NaN
+    """
+    window = amounts[-5:]
+    if len(window) == 0 or np.isnan(window).all():
+        raise ValueError("no amounts in the last 5 entries")
+    
+    return _round_cents(float(np.nanmean(window)))
+
+
+class RollingMean5:
+    """
+    Running last-5 average, updated as transactions arrive
+    
+    Keeps a 5-slot ring buffer and its sum, so predict() is O(1)
+    regardless of history length.
+    """
+    
+    __slots__ = ("buf", "idx", "count", "total")
+    
+    def __init__(self, amounts=()):
+        self.buf = array('d', [0.0] * 5)
+        self.idx = 0
+        self.count = 0
+        self.total = 0.0
+        for amount in amounts:
+            self.push(amount)
+    
+    def push(self, amount) -> None:
+        """
+        Add the newest amount, evicting the oldest once 5 are held
+        
+        Missing and NaN amounts are skipped, as in
+        heuristic_predict_last5_avg; infinite ones raise ValueError.
+        """
+        if amount is None:
+            return
+        amount = float(amount)
+        if isnan(amount):
+            return
+        if not isfinite(amount):
+            raise ValueError(f"cannot push non-finite amount {amount!r}")
+        
+        self.total += amount - self.buf[self.idx]
+        self.buf[self.idx] = amount
+        self.idx = (self.idx + 1) % 5
+        self.count += 1
+        
+        # Resum once per lap so floating-point drift cannot accumulate
+        if self.idx == 0:
+            self.total = fsum(self.buf)
+    
+    def predict(self) -> float:
+        """Average of the amounts in the window, rounded to 2 decimals"""
+        if self.count == 0:
+            raise ValueError("no amounts pushed yet")
+        
+        return _round_cents(self.total / min(5, self.count))
+
+
+def batch_predict_last5(windows: np.ndarray, counts: np.ndarray = None) -> np.ndarray:
+    """
+    Predict the next expense for many users at once
+    
+    Each row holds one user's last amounts, zero-padded when the user has
+    fewer than 5; counts gives the real window size per row (all rows are
+    full when omitted). Row sums come from a Numba kernel when numba is
+    installed, otherwise from one NumPy reduction.
+    
+    Returns:
+        np.ndarray: One prediction per row, rounded to 2 decimals
+    
+    Raises:
+        ValueError: If windows is not 2-D, holds a NaN or infinite amount,
+            or counts does not match it
+    """
+    windows = np.ascontiguousarray(windows, dtype=np.float64)
+    if windows.ndim != 2 or windows.shape[1] == 0:
+        raise ValueError("windows must be a 2-D array with one row per user")
+    if not np.isfinite(windows).all():
+        raise ValueError("windows must hold finite amounts only")
+    
+    if counts is None:
+        counts = windows.shape[1]
+    else:
+        counts = np.asarray(counts, dtype=np.float64)
+        if counts.shape != (windows.shape[0],) or np.any((counts < 1) | (counts > windows.shape[1])):
+            raise ValueError("counts must give each row's window size, between 1 and its width")
+    
+    cents = _sum_rows(windows) / counts * 100
+    return np.trunc(cents + np.copysign(0.5, cents)) / 100
+
+
+def windows_from_amounts(amount_lists: List[List[float]], width: int = 5):
+    """
+    Pack per-user amount lists into inputs for batch_predict_last5
+    
+    Lists are newest first, as returned by
+    ExpenseService.get_recent_amounts_by_user; missing and NaN amounts
+    are skipped. Users without any amount get a count of 0 and must be
+    filtered out before predicting.
+    
+    Returns:
+        tuple: (windows (N, width) float64 array, counts (N,) int array)
+    """
+    windows = np.zeros((len(amount_lists), width), dtype=np.float64)
+    counts = np.zeros(len(amount_lists), dtype=np.int64)
+    for row, amounts in enumerate(amount_lists):
+        present = [amount for amount in map(float, filter(_is_present, amounts[:width]))
+                   if not isnan(amount)]
+        windows[row, :len(present)] = present
+        counts[row] = len(present)
+    
+    return windows, counts
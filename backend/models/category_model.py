@@ -5,6 +5,7 @@ Category Model - Custom expense categories
 from datetime import datetime
 from bson import ObjectId
 from marshmallow import Schema, fields, validate
+from .serialization import isoformat
 
 
 class Category:
@@ -71,15 +72,46 @@ class Category:
             updated_at=doc.get('updated_at')
         )
     
-    def update(self, **kwargs):
-        """Update category fields"""
+    @staticmethod
+    def docs_to_dicts(docs):
+        """
+        Convert MongoDB documents straight to category dictionaries
+        
+        Produces the same output as from_mongo(doc).to_dict() without
+        building a Category per row. Used by list endpoints.
+        """
+        return [
+            {
+                '_id': str(doc['_id']),
+                'user_id': str(doc['user_id']),
+                'name': doc['name'].strip(),
+                'icon': doc.get('icon') or 'tag',
+                'color': doc.get('color') or '#D2042D',
+                'budget_limit': doc.get('budget_limit'),
+                'is_default': doc.get('is_default', False),
+                'created_at': isoformat(doc.get('created_at')),
+                'updated_at': isoformat(doc.get('updated_at'))
+            }
+            for doc in docs
+        ]
+    
+    @staticmethod
+    def update_fields(**kwargs):
+        """Build the $set document for a category update"""
         allowed_fields = ['name', 'icon', 'color', 'budget_limit']
         
-        for key, value in kwargs.items():
-            if key in allowed_fields and value is not None:
-                setattr(self, key, value)
+        fields = {
+            key: value for key, value in kwargs.items()
+            if key in allowed_fields and value is not None
+        }
+        fields['updated_at'] = datetime.utcnow()
         
-        self.updated_at = datetime.utcnow()
+        return fields
+    
+    def update(self, **kwargs):
+        """Update category fields"""
+        for key, value in Category.update_fields(**kwargs).items():
+            setattr(self, key, value)
 
 
 class CategorySchema(Schema):
@@ -6,6 +6,7 @@ from datetime import datetime
 from bson import ObjectId
 from marshmallow import Schema, fields, validate, validates, ValidationError
 from typing import Optional
+from .serialization import isoformat, projected_out
 
 
 class Expense:
@@ -22,6 +23,16 @@ class Expense:
         'Credit Card', 'Debit Card', 'Cash', 'UPI', 'Bank Transfer'
     ]
     
+    # Document fields besides _id, as serialized by to_dict
+    STORED_FIELDS = (
+        'user_id', 'amount', 'category', 'payment_type', 'date',
+        'notes', 'tags', 'receipt_url', 'created_at', 'updated_at'
+    )
+    
+    # Set views for membership tests; the lists keep schema error messages ordered
+    _CATEGORY_SET = frozenset(VALID_CATEGORIES)
+    _PAYMENT_TYPE_SET = frozenset(VALID_PAYMENT_TYPES)
+    
     def __init__(self, user_id, amount, category, payment_type, 
                 date=None, notes='', tags=None, receipt_url=None,
                 created_at=None, updated_at=None, _id=None):
@@ -41,7 +52,7 @@ class Expense:
         """Convert expense to dictionary"""
         return {
             '_id': str(self._id),
-            'user_id': str(self.user_id),
+            'user_id': str(self.user_id) if self.user_id else None,
             'amount': self.amount,
             'category': self.category,
             'payment_type': self.payment_type,
@@ -89,33 +100,122 @@ class Expense:
             updated_at=doc.get('updated_at')
         )
     
-    def update(self, **kwargs):
-        """Update expense fields"""
+    @staticmethod
+    def from_mongo_partial(doc):
+        """
+        Create Expense instance from a projected MongoDB document
+        
+        Fields left out by the projection stay None instead of being
+        defaulted, so ids and timestamps are never invented.
+        """
+        if not doc:
+            return None
+        
+        expense = Expense.__new__(Expense)
+        expense._id = doc.get('_id')
+        expense.user_id = doc.get('user_id')
+        expense.amount = doc.get('amount')
+        expense.category = doc.get('category')
+        expense.payment_type = doc.get('payment_type')
+        expense.date = doc.get('date')
+        expense.notes = doc.get('notes', '')
+        expense.tags = doc.get('tags')
+        expense.receipt_url = doc.get('receipt_url')
+        expense.created_at = doc.get('created_at')
+        expense.updated_at = doc.get('updated_at')
+        return expense
+    
+    @staticmethod
+    def docs_to_dicts(docs, projection=None):
+        """
+        Convert MongoDB documents straight to expense dictionaries
+        
+        Produces the same output as from_mongo_partial(doc).to_dict()
+        without building an Expense per row. Used by list endpoints.
+        Pass the projection the documents were read with so the fields
+        it left out are dropped rather than reported as null.
+        """
+        omitted = projected_out(Expense.STORED_FIELDS, projection)
+        rows = [
+            {
+                '_id': str(doc['_id']),
+                'user_id': str(doc['user_id']) if doc.get('user_id') else None,
+                'amount': doc.get('amount'),
+                'category': doc.get('category'),
+                'payment_type': doc.get('payment_type'),
+                'date': isoformat(doc.get('date')),
+                'notes': doc.get('notes', ''),
+                'tags': doc.get('tags'),
+                'receipt_url': doc.get('receipt_url'),
+                'created_at': isoformat(doc.get('created_at')),
+                'updated_at': isoformat(doc.get('updated_at'))
+            }
+            for doc in docs
+        ]
+        
+        if omitted:
+            for row in rows:
+                for field in omitted:
+                    del row[field]
+        
+        return rows
+    
+    @staticmethod
+    def update_fields(**kwargs):
+        """Build the $set document for an expense update"""
         allowed_fields = [
             'amount', 'category', 'payment_type', 'date', 
             'notes', 'tags', 'receipt_url'
         ]
         
+        fields = {}
         for key, value in kwargs.items():
             if key in allowed_fields and value is not None:
                 if key == 'amount':
-                    setattr(self, key, float(value))
+                    value = float(value)
                 elif key == 'date' and isinstance(value, str):
-                    setattr(self, key, datetime.fromisoformat(value))
-                else:
-                    setattr(self, key, value)
+                    value = datetime.fromisoformat(value)
+                fields[key] = value
+        
+        fields['updated_at'] = datetime.utcnow()
         
-        self.updated_at = datetime.utcnow()
+        return fields
+    
+    @staticmethod
+    def recent_amounts_pipeline(window=5, user_ids=None):
+        """
+        Aggregation returning each user's latest amounts, newest first
+        
+        $topN keeps the first window amounts per user after sorting by
+        date, so only those leave the server.
+        """
+        pipeline = []
+        if user_ids is not None:
+            pipeline.append({'$match': {'user_id': {'$in': list(user_ids)}}})
+        pipeline.append({'$group': {
+            '_id': '$user_id',
+            'amounts': {'$topN': {
+                'n': max(window, 1),
+                'sortBy': {'date': -1},
+                'output': '$amount'
+            }}
+        }})
+        return pipeline
+    
+    def update(self, **kwargs):
+        """Update expense fields"""
+        for key, value in Expense.update_fields(**kwargs).items():
+            setattr(self, key, value)
     
     @staticmethod
     def validate_category(category):
         """Validate expense category"""
-        return category in Expense.VALID_CATEGORIES
+        return category in Expense._CATEGORY_SET
     
     @staticmethod
     def validate_payment_type(payment_type):
         """Validate payment type"""
-        return payment_type in Expense.VALID_PAYMENT_TYPES
+        return payment_type in Expense._PAYMENT_TYPE_SET
 
 
 class ExpenseSchema(Schema):
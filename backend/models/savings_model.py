@@ -5,6 +5,14 @@ Savings Goal Model - Track savings goals
 from datetime import datetime
 from bson import ObjectId
 from marshmallow import Schema, fields, validate, validates, ValidationError
+from .serialization import isoformat, projected_out
+
+
+def _to_datetime(value):
+    """Parse ISO deadline strings, pass datetimes through, empty to None"""
+    if isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(value) if value else None
 
 
 class SavingsGoal:
@@ -14,6 +22,16 @@ class SavingsGoal:
 
     STATUS_OPTIONS = ['active', 'completed', 'paused', 'cancelled']
 
+    # Only active goals can be overdue; the overdue index is partial on this
+    OVERDUE_FILTER = {'status': 'active'}
+
+    # Document fields besides _id; the remaining to_dict keys are derived
+    STORED_FIELDS = (
+        'user_id', 'title', 'target_amount', 'saved_amount', 'deadline',
+        'description', 'priority', 'status', 'created_at', 'updated_at',
+        'completed_at'
+    )
+
     def __init__(self, user_id, title, target_amount, saved_amount=0,
                  deadline=None, description='', priority='medium',
                  status='active', created_at=None, updated_at=None,
@@ -28,17 +46,19 @@ class SavingsGoal:
         self.description = description.strip() if description else ''
         self.priority = priority
         self.status = status
-        self.created_at = created_at or datetime.utcnow()
-        self.updated_at = updated_at or datetime.utcnow()
+        now = datetime.utcnow()
+        self.created_at = created_at or now
+        self.updated_at = updated_at or now
         self.completed_at = completed_at
 
     def to_dict(self):
         """Convert savings goal to dictionary"""
         progress = (self.saved_amount / self.target_amount * 100) if self.target_amount > 0 else 0
+        now = datetime.utcnow()
 
         return {
             '_id': str(self._id),
-            'user_id': str(self.user_id),
+            'user_id': str(self.user_id) if self.user_id else None,
             'title': self.title,
             'target_amount': self.target_amount,
             'saved_amount': self.saved_amount,
@@ -48,8 +68,8 @@ class SavingsGoal:
             'description': self.description,
             'priority': self.priority,
             'status': self.status,
-            'is_overdue': self.is_overdue(),
-            'days_remaining': self.days_remaining(),
+            'is_overdue': self.is_overdue(now),
+            'days_remaining': self.days_remaining(now),
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None,
             'completed_at': self.completed_at.isoformat() if self.completed_at else None
@@ -94,25 +114,114 @@ class SavingsGoal:
             completed_at=doc.get('completed_at')
         )
 
-    def add_savings(self, amount):
+    @staticmethod
+    def overdue_query(user_id, now=None):
+        """
+        Filter for a user's goals that are past deadline and still active
+
+        Always includes OVERDUE_FILTER; without it the partial overdue
+        index cannot serve the query and hinting it fails.
+        """
+        return {
+            'user_id': user_id,
+            **SavingsGoal.OVERDUE_FILTER,
+            'deadline': {'$lt': now or datetime.utcnow()}
+        }
+
+    @staticmethod
+    def from_mongo_partial(doc):
+        """
+        Create SavingsGoal instance from a projected MongoDB document
+
+        Fields left out by the projection stay None instead of being
+        defaulted, so ids and timestamps are never invented.
+        """
+        if not doc:
+            return None
+
+        goal = SavingsGoal.__new__(SavingsGoal)
+        goal._id = doc.get('_id')
+        goal.user_id = doc.get('user_id')
+        goal.title = doc.get('title')
+        goal.target_amount = doc.get('target_amount')
+        goal.saved_amount = doc.get('saved_amount', 0)
+        goal.deadline = doc.get('deadline')
+        goal.description = doc.get('description', '')
+        goal.priority = doc.get('priority', 'medium')
+        goal.status = doc.get('status', 'active')
+        goal.created_at = doc.get('created_at')
+        goal.updated_at = doc.get('updated_at')
+        goal.completed_at = doc.get('completed_at')
+        return goal
+
+    @staticmethod
+    def docs_to_dicts(docs, projection=None):
+        """
+        Convert MongoDB documents straight to savings goal dictionaries
+
+        Produces the same output as from_mongo_partial(doc).to_dict()
+        without building a SavingsGoal per row. Used by list endpoints.
+        Pass the projection the documents were read with so the fields
+        it left out are dropped rather than reported as empty.
+        """
+        omitted = projected_out(SavingsGoal.STORED_FIELDS, projection)
+        now = datetime.utcnow()
+        goals = []
+
+        for doc in docs:
+            target_amount = doc.get('target_amount')
+            saved_amount = doc.get('saved_amount', 0)
+            status = doc.get('status', 'active')
+            deadline = doc.get('deadline')
+            deadline_dt = _to_datetime(deadline) if status != 'completed' else None
+            progress = (saved_amount / target_amount * 100) if target_amount > 0 else 0
+
+            goals.append({
+                '_id': str(doc['_id']),
+                'user_id': str(doc['user_id']) if doc.get('user_id') else None,
+                'title': doc.get('title'),
+                'target_amount': target_amount,
+                'saved_amount': saved_amount,
+                'remaining_amount': target_amount - saved_amount,
+                'progress_percent': round(progress, 2),
+                'deadline': isoformat(deadline),
+                'description': doc.get('description', ''),
+                'priority': doc.get('priority', 'medium'),
+                'status': status,
+                'is_overdue': deadline_dt is not None and now > deadline_dt and saved_amount < target_amount,
+                'days_remaining': max(0, (deadline_dt - now).days) if deadline_dt is not None else None,
+                'created_at': isoformat(doc.get('created_at')),
+                'updated_at': isoformat(doc.get('updated_at')),
+                'completed_at': isoformat(doc.get('completed_at'))
+            })
+
+        if omitted:
+            for goal in goals:
+                for field in omitted:
+                    del goal[field]
+
+        return goals
+
+    def add_savings(self, amount, now=None):
         """Add amount to saved total"""
+        now = now or datetime.utcnow()
         self.saved_amount += float(amount)
-        self.updated_at = datetime.utcnow()
+        self.updated_at = now
 
         # Check if goal is completed
         if self.saved_amount >= self.target_amount and self.status == 'active':
             self.status = 'completed'
-            self.completed_at = datetime.utcnow()
+            self.completed_at = now
 
         return self.saved_amount
 
-    def withdraw_savings(self, amount):
+    def withdraw_savings(self, amount, now=None):
         """Withdraw amount from savings"""
         if amount > self.saved_amount:
             raise ValueError("Cannot withdraw more than saved amount")
 
         self.saved_amount -= float(amount)
-        self.updated_at = datetime.utcnow()
+        self.updated_at = now or datetime.utcnow()
 
         # Reactivate if was completed
         if self.status == 'completed' and self.saved_amount < self.target_amount:
@@ -121,42 +230,51 @@ class SavingsGoal:
 
         return self.saved_amount
 
-    def update(self, **kwargs):
-        """Update goal fields"""
+    @staticmethod
+    def update_fields(now=None, **kwargs):
+        """Build the $set document for a goal update"""
         allowed_fields = ['title', 'target_amount', 'saved_amount', 'deadline',
                           'description', 'priority', 'status']
 
+        fields = {}
         for key, value in kwargs.items():
             if key in allowed_fields and value is not None:
                 if key in ['target_amount', 'saved_amount']:
-                    setattr(self, key, float(value))
+                    value = float(value)
                 elif key == 'deadline' and isinstance(value, str):
-                    setattr(self, key, datetime.fromisoformat(value))
-                else:
-                    setattr(self, key, value)
+                    value = datetime.fromisoformat(value)
+                fields[key] = value
+
+        fields['updated_at'] = now or datetime.utcnow()
 
-        self.updated_at = datetime.utcnow()
+        return fields
+
+    def update(self, now=None, **kwargs):
+        """Update goal fields"""
+        now = now or datetime.utcnow()
+        for key, value in SavingsGoal.update_fields(now=now, **kwargs).items():
+            setattr(self, key, value)
 
         # Check completion status
         if self.saved_amount >= self.target_amount and self.status == 'active':
             self.status = 'completed'
-            self.completed_at = datetime.utcnow()
+            self.completed_at = now
 
-    def is_overdue(self):
+    def is_overdue(self, now=None):
         """Check if goal is past deadline"""
         if not self.deadline or self.status == 'completed':
             return False
 
         deadline_dt = self.deadline if isinstance(self.deadline, datetime) else datetime.fromisoformat(self.deadline)
-        return datetime.utcnow() > deadline_dt and self.saved_amount < self.target_amount
+        return (now or datetime.utcnow()) > deadline_dt and self.saved_amount < self.target_amount
 
-    def days_remaining(self):
+    def days_remaining(self, now=None):
         """Calculate days remaining until deadline"""
         if not self.deadline or self.status == 'completed':
             return None
 
         deadline_dt = self.deadline if isinstance(self.deadline, datetime) else datetime.fromisoformat(self.deadline)
-        delta = deadline_dt - datetime.utcnow()
+        delta = deadline_dt - (now or datetime.utcnow())
         return max(0, delta.days)
 
     def get_progress_percentage(self):
@@ -0,0 +1,17 @@
+"""
+Serialization helpers shared by the models' docs_to_dicts converters
+"""
+
+from datetime import datetime
+
+
+def isoformat(value):
+    """Serialize datetimes to ISO strings, pass other values through"""
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def projected_out(stored_fields, projection):
+    """Stored fields an inclusion projection left out (none without one)"""
+    if projection is None:
+        return ()
+    return tuple(field for field in stored_fields if field not in projection)
@@ -3,13 +3,14 @@ Category Routes - Custom category management endpoints
 """
 
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from backend.services.category_service import CategoryService
+from flask_jwt_extended import jwt_required
+from backend.services.category_service import category_service
+from backend.utils.jwt_utils import get_current_user_id
+from backend.utils.validation import requires_object_ids
 from backend.models.category_model import CategorySchema, CategoryUpdateSchema
 from marshmallow import ValidationError
 
 bp = Blueprint('categories', __name__)
-category_service = CategoryService()
 category_schema = CategorySchema()
 update_schema = CategoryUpdateSchema()
 
@@ -34,11 +35,11 @@ def create_category():
         - 400: Validation error or duplicate name
     """
     try:
-        user_id = get_jwt_identity()
+        user_id = get_current_user_id()
         data = request.get_json()
         
         # Add user_id to data
-        data['user_id'] = user_id
+        data['user_id'] = str(user_id)
         
         # Validate input
         validated_data = category_schema.load(data)
@@ -73,7 +74,7 @@ def get_categories():
         - 200: Categories list
     """
     try:
-        user_id = get_jwt_identity()
+        user_id = get_current_user_id()
         
         result = category_service.get_user_categories(user_id)
         
@@ -85,6 +86,7 @@ def get_categories():
 
 @bp.route('/<category_id>', methods=['GET'])
 @jwt_required()
+@requires_object_ids('category_id')
 def get_category(category_id):
     """
     Get a specific category by ID
@@ -100,7 +102,7 @@ def get_category(category_id):
         - 404: Category not found
     """
     try:
-        user_id = get_jwt_identity()
+        user_id = get_current_user_id()
         
         result = category_service.get_category_by_id(category_id, user_id)
         
@@ -115,6 +117,7 @@ def get_category(category_id):
 
 @bp.route('/<category_id>', methods=['PUT'])
 @jwt_required()
+@requires_object_ids('category_id')
 def update_category(category_id):
     """
     Update a category
@@ -137,7 +140,7 @@ def update_category(category_id):
         - 404: Category not found
     """
     try:
-        user_id = get_jwt_identity()
+        user_id = get_current_user_id()
         data = request.get_json()
         
         # Validate input
@@ -162,6 +165,7 @@ def update_category(category_id):
 
 @bp.route('/<category_id>', methods=['DELETE'])
 @jwt_required()
+@requires_object_ids('category_id')
 def delete_category(category_id):
     """
     Delete a category
@@ -178,7 +182,7 @@ def delete_category(category_id):
         - 404: Category not found
     """
     try:
-        user_id = get_jwt_identity()
+        user_id = get_current_user_id()
         
         result = category_service.delete_category(category_id, user_id)
         
@@ -3,14 +3,15 @@ Expense Routes - Expense management endpoints
 """
 
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from backend.services.expense_service import ExpenseService
+from flask_jwt_extended import jwt_required
+from backend.services.expense_service import expense_service
+from backend.utils.jwt_utils import get_current_user_id
+from backend.utils.validation import requires_object_ids
 from backend.models.expense_model import ExpenseSchema, ExpenseUpdateSchema, ExpenseFilterSchema
 from marshmallow import ValidationError
 from datetime import datetime
 
 bp = Blueprint('expenses', __name__)
-expense_service = ExpenseService()
 expense_schema = ExpenseSchema()
 update_schema = ExpenseUpdateSchema()
 filter_schema = ExpenseFilterSchema()
@@ -38,11 +39,11 @@ def create_expense():
         - 400: Validation error
     """
     try:
-        user_id = get_jwt_identity()
+        user_id = get_current_user_id()
         data = request.get_json()
         
         # Add user_id to data
-        data['user_id'] = user_id
+        data['user_id'] = str(user_id)
         
         # Validate input
         validated_data = expense_schema.load(data)
@@ -87,7 +88,7 @@ def get_expenses():
         - 200: Expenses list with pagination
     """
     try:
-        user_id = get_jwt_identity()
+        user_id = get_current_user_id()
         
         # Get query parameters
         page = request.args.get('page', 1, type=int)
@@ -133,7 +134,7 @@ def get_recent_expenses():
         - 200: Recent expenses list
     """
     try:
-        user_id = get_jwt_identity()
+        user_id = get_current_user_id()
         limit = request.args.get('limit', 10, type=int)
         
         result = expense_service.get_recent_expenses(user_id, limit)
@@ -146,6 +147,7 @@ def get_recent_expenses():
 
 @bp.route('/<expense_id>', methods=['GET'])
 @jwt_required()
+@requires_object_ids('expense_id')
 def get_expense(expense_id):
     """
     Get a specific expense by ID
@@ -161,7 +163,7 @@ def get_expense(expense_id):
         - 404: Expense not found
     """
     try:
-        user_id = get_jwt_identity()
+        user_id = get_current_user_id()
         
         result = expense_service.get_expense_by_id(expense_id, user_id)
         
@@ -176,6 +178,7 @@ def get_expense(expense_id):
 
 @bp.route('/<expense_id>', methods=['PUT'])
 @jwt_required()
+@requires_object_ids('expense_id')
 def update_expense(expense_id):
     """
     Update an expense
@@ -200,7 +203,7 @@ def update_expense(expense_id):
         - 404: Expense not found
     """
     try:
-        user_id = get_jwt_identity()
+        user_id = get_current_user_id()
         data = request.get_json()
         
         # Validate input
@@ -225,6 +228,7 @@ def update_expense(expense_id):
 
 @bp.route('/<expense_id>', methods=['DELETE'])
 @jwt_required()
+@requires_object_ids('expense_id')
 def delete_expense(expense_id):
     """
     Delete an expense
@@ -240,7 +244,7 @@ def delete_expense(expense_id):
         - 404: Expense not found
     """
     try:
-        user_id = get_jwt_identity()
+        user_id = get_current_user_id()
         
         result = expense_service.delete_expense(expense_id, user_id)
         
@@ -270,7 +274,7 @@ def get_statistics():
         - 200: Statistics data
     """
     try:
-        user_id = get_jwt_identity()
+        user_id = get_current_user_id()
         
         # Get date range
         start_date = None
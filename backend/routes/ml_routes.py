@@ -3,11 +3,14 @@ ML Routes - Machine learning powered insights and predictions
 FIXED VERSION with proper error handling
 """
 
-from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from backend.services.expense_service import ExpenseService
+import hashlib
+from flask import Blueprint, request, jsonify, make_response
+from flask_jwt_extended import jwt_required
+from backend.services.expense_service import expense_service
+from backend.utils.jwt_utils import get_current_user_id
 from backend.ml.forecasting import get_expense_forecast, get_category_forecast
 from backend.ml.anomaly_detection import check_spending_anomalies, check_budget_status
+from backend.ml.prediction import heuristic_predict_last5_avg
 from backend.ml.insights import (
     get_spending_insights,
     get_budget_recommendations,
@@ -16,7 +19,6 @@ from backend.ml.insights import (
 )
 
 bp = Blueprint('ml', __name__)
-expense_service = ExpenseService()
 
 
 @bp.route('/forecast', methods=['GET'])
@@ -33,7 +35,7 @@ def get_forecast():
         - 400: Insufficient data for prediction
     """
     try:
-        user_id = get_jwt_identity()
+        user_id = get_current_user_id()
         
         # Get user's expenses
         result = expense_service.get_user_expenses(user_id, limit=1000)
@@ -88,7 +90,7 @@ def get_category_forecast_route(category):
         - 400: Insufficient data
     """
     try:
-        user_id = get_jwt_identity()
+        user_id = get_current_user_id()
         days = request.args.get('days', 30, type=int)
         
         # Validate days parameter
@@ -142,7 +144,7 @@ def detect_anomalies():
         - 200: Detected anomalies
     """
     try:
-        user_id = get_jwt_identity()
+        user_id = get_current_user_id()
         monthly_budget = request.args.get('monthly_budget', type=float)
         
         # Get user's expenses
@@ -194,7 +196,7 @@ def get_budget_status():
         - 400: Monthly budget required
     """
     try:
-        user_id = get_jwt_identity()
+        user_id = get_current_user_id()
         monthly_budget = request.args.get('monthly_budget', type=float)
         
         if not monthly_budget:
@@ -259,7 +261,7 @@ def get_insights():
         - 200: Spending insights, patterns, and tips
     """
     try:
-        user_id = get_jwt_identity()
+        user_id = get_current_user_id()
         
         # Get user's expenses
         result = expense_service.get_user_expenses(user_id, limit=1000)
@@ -308,7 +310,7 @@ def get_budget_recommendations_route():
         - 200: Budget recommendations
     """
     try:
-        user_id = get_jwt_identity()
+        user_id = get_current_user_id()
         income = request.args.get('income', type=float)
         
         # Validate income if provided
@@ -386,7 +388,7 @@ def get_financial_health():
         - 200: Financial health score and breakdown
     """
     try:
-        user_id = get_jwt_identity()
+        user_id = get_current_user_id()
         income = request.args.get('income', type=float)
         savings = request.args.get('savings', type=float)
         
@@ -450,7 +452,7 @@ def compare_with_benchmarks():
         - 200: Comparison with benchmarks
     """
     try:
-        user_id = get_jwt_identity()
+        user_id = get_current_user_id()
         income = request.args.get('income', type=float)
         
         # Validate income if provided
@@ -486,4 +488,72 @@ def compare_with_benchmarks():
         return jsonify({
             'success': False,
             'error': f'Benchmark comparison failed: {str(e)}'
-        }), 500
\ No newline at end of file
+        }), 500
+
+
+@bp.route('/predict-next', methods=['GET'])
+@jwt_required()
+def predict_next_expense():
+    """
+    Predict the next expense amount from the last 5 expenses
+    
+    The ETag is derived from the expenses in the window, so clients can
+    revalidate with If-None-Match and get a 304 until it changes.
+    
+    Headers:
+        - Authorization: Bearer <access_token>
+        - If-None-Match (optional): ETag from a previous response
+    
+    Returns:
+        - 200: Predicted amount
+        - 304: Prediction unchanged
+        - 400: No expenses to predict from
+    """
+    try:
+        user_id = get_current_user_id()
+        
+        # Newest first
+        result = expense_service.get_recent_expenses(user_id, limit=5)
+        
+        if not result['success']:
+            return jsonify({
+                'success': False,
+                'error': 'Failed to get expenses'
+            }), 400
+        
+        recent = result['expenses']
+        if len(recent) == 0:
+            return jsonify({
+                'success': False,
+                'error': 'No expenses found',
+                'message': 'Please add expenses to get a prediction'
+            }), 400
+        
+        window = ';'.join(f"{expense['_id']}:{expense['amount']}" for expense in recent)
+        etag = hashlib.sha1(f'{user_id}:{window}'.encode()).hexdigest()
+        
+        # The predictor is skipped entirely on a cache hit
+        if etag in request.if_none_match:
+            response = make_response('', 304)
+        else:
+            history = recent[::-1]
+            response = make_response(jsonify({
+                'success': True,
+                'predicted_amount': heuristic_predict_last5_avg(history),
+                'based_on': len(history)
+            }), 200)
+        
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'private, max-age=60'
+        return response
+    
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'Prediction failed: {str(e)}'
+        }), 500
@@ -74,15 +74,21 @@ def get_goals():
     
     Query Parameters:
         - status (str, optional): Filter by status (active, completed, paused, cancelled)
+        - page (int, optional): Page number (default: 1)
+        - limit (int, optional): Items per page (default: 50)
+        - count_only (bool, optional): Only return the number of matching goals
     
     Returns:
-        - 200: Goals list with summary
+        - 200: Goals page with summary and pagination, or count
     """
     try:
         user_id = get_jwt_identity()
         status = request.args.get('status')
+        page = request.args.get('page', 1, type=int)
+        limit = request.args.get('limit', 50, type=int)
+        count_only = request.args.get('count_only', 'false').lower() == 'true'
         
-        result = savings_service.get_user_goals(user_id, status)
+        result = savings_service.get_user_goals(user_id, status, page, limit, count_only)
         
         return jsonify(result), 200
     
@@ -90,6 +96,29 @@ def get_goals():
         return jsonify({'error': f'Failed to get goals: {str(e)}'}), 500
 
 
+@bp.route('/summary', methods=['GET'])
+@jwt_required()
+def get_goals_summary():
+    """
+    Get savings goal counts and totals without the goals list
+    
+    Headers:
+        - Authorization: Bearer <access_token>
+    
+    Returns:
+        - 200: Goals summary
+    """
+    try:
+        user_id = get_jwt_identity()
+        
+        result = savings_service.get_user_goals_summary(user_id)
+        
+        return jsonify(result), 200
+    
+    except Exception as e:
+        return jsonify({'error': f'Failed to get goals summary: {str(e)}'}), 500
+
+
 @bp.route('/overdue', methods=['GET'])
 @jwt_required()
 def get_overdue_goals():
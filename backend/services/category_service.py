@@ -3,10 +3,33 @@ Category Service - Handles category CRUD operations
 """
 
 from backend.models.category_model import Category
-from backend.utils.db_connection import get_categories_collection
+from backend.utils.db_connection import (
+    get_categories_collection, get_expenses_collection, query_hint,
+    EXPENSES_USER_CATEGORY_INDEX
+)
 from backend.utils.validation import sanitize_string
-from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
 from datetime import datetime
+from cachetools import TTLCache
+import threading
+
+
+# Per-user category lists, invalidated on create/update/delete.
+# Process-local: multi-process deployments should move this to Redis
+# using the same user_id key. Every invalidation bumps the generation;
+# a list read before one is not cached, since it may predate the write.
+_categories_cache = TTLCache(maxsize=10_000, ttl=60)
+_categories_cache_generation = 0
+_categories_cache_lock = threading.Lock()
+
+
+def _invalidate_user_categories(user_id):
+    """Drop cached categories for a user"""
+    global _categories_cache_generation
+    with _categories_cache_lock:
+        _categories_cache_generation += 1
+        _categories_cache.pop(user_id, None)
 
 
 class CategoryService:
@@ -14,22 +37,20 @@ class CategoryService:
     
     def __init__(self):
         self.categories = get_categories_collection()
+        self.expenses = get_expenses_collection()
     
     def create_category(self, user_id, category_data):
         """
         Create a new category
         
         Args:
-            user_id: User's MongoDB ObjectId or string
+            user_id: User's MongoDB ObjectId
             category_data (dict): Category details
         
         Returns:
             dict: Success status and created category or error message
         """
         try:
-            if isinstance(user_id, str):
-                user_id = ObjectId(user_id)
-            
             # Sanitize name
             name = sanitize_string(category_data.get('name', ''), max_length=50)
             
@@ -39,18 +60,6 @@ class CategoryService:
                     'message': 'Category name is required'
                 }
             
-            # Check if category already exists for this user
-            existing = self.categories.find_one({
-                'user_id': user_id,
-                'name': name
-            })
-            
-            if existing:
-                return {
-                    'success': False,
-                    'message': 'Category with this name already exists'
-                }
-            
             # Create category
             category = Category(
                 user_id=user_id,
@@ -60,8 +69,16 @@ class CategoryService:
                 budget_limit=category_data.get('budget_limit')
             )
             
-            # Insert into database
-            result = self.categories.insert_one(category.to_mongo())
+            # Insert into database; the (user_id, name) unique index rejects duplicates
+            try:
+                result = self.categories.insert_one(category.to_mongo())
+            except DuplicateKeyError:
+                return {
+                    'success': False,
+                    'message': 'Category with this name already exists'
+                }
+            
+            _invalidate_user_categories(user_id)
             
             # Get created category
             created_category = self.categories.find_one({'_id': result.inserted_id})
@@ -84,23 +101,29 @@ class CategoryService:
         Get all categories for a user (including default ones)
         
         Args:
-            user_id: User's MongoDB ObjectId or string
+            user_id: User's MongoDB ObjectId
         
         Returns:
             dict: Categories list
         """
         try:
-            if isinstance(user_id, str):
-                user_id = ObjectId(user_id)
-            
-            # Get user's custom categories
-            cursor = self.categories.find({'user_id': user_id}).sort('created_at', -1)
-            categories_list = [Category.from_mongo(doc).to_dict() for doc in cursor]
-            
-            # Add default categories if user has no custom ones
-            if len(categories_list) == 0:
-                default_categories = self._create_default_categories(user_id)
-                categories_list = default_categories
+            with _categories_cache_lock:
+                categories_list = _categories_cache.get(user_id)
+                generation = _categories_cache_generation
+            
+            if categories_list is None:
+                # Get user's custom categories
+                cursor = self.categories.find({'user_id': user_id}).sort('created_at', -1)
+                categories_list = Category.docs_to_dicts(cursor)
+                
+                # Add default categories if user has no custom ones
+                if len(categories_list) == 0:
+                    default_categories = self._create_default_categories(user_id)
+                    categories_list = default_categories
+                
+                with _categories_cache_lock:
+                    if generation == _categories_cache_generation:
+                        _categories_cache[user_id] = categories_list
             
             return {
                 'success': True,
@@ -157,18 +180,13 @@ class CategoryService:
         Get single category by ID
         
         Args:
-            category_id: Category's MongoDB ObjectId or string
-            user_id: User's MongoDB ObjectId or string
+            category_id: Category's MongoDB ObjectId
+            user_id: User's MongoDB ObjectId
         
         Returns:
             dict: Category data or error message
         """
         try:
-            if isinstance(category_id, str):
-                category_id = ObjectId(category_id)
-            if isinstance(user_id, str):
-                user_id = ObjectId(user_id)
-            
             category_doc = self.categories.find_one({
                 '_id': category_id,
                 'user_id': user_id
@@ -180,11 +198,9 @@ class CategoryService:
                     'message': 'Category not found'
                 }
             
-            category = Category.from_mongo(category_doc)
-            
             return {
                 'success': True,
-                'category': category.to_dict()
+                'category': Category.docs_to_dicts([category_doc])[0]
             }
         
         except Exception as e:
@@ -198,64 +214,51 @@ class CategoryService:
         Update a category
         
         Args:
-            category_id: Category's MongoDB ObjectId or string
-            user_id: User's MongoDB ObjectId or string
+            category_id: Category's MongoDB ObjectId
+            user_id: User's MongoDB ObjectId
             update_data (dict): Fields to update
         
         Returns:
             dict: Success status and updated category or error message
         """
         try:
-            if isinstance(category_id, str):
-                category_id = ObjectId(category_id)
-            if isinstance(user_id, str):
-                user_id = ObjectId(user_id)
-            
-            category_doc = self.categories.find_one({
-                '_id': category_id,
-                'user_id': user_id
-            })
-            
-            if not category_doc:
-                return {
-                    'success': False,
-                    'message': 'Category not found'
-                }
-            
-            category = Category.from_mongo(category_doc)
-            
-            # Cannot modify default categories
-            if category.is_default and 'name' in update_data:
-                return {
-                    'success': False,
-                    'message': 'Cannot modify default category name'
-                }
+            query = {'_id': category_id, 'user_id': user_id}
             
             # Sanitize name if provided
             if 'name' in update_data:
                 update_data['name'] = sanitize_string(update_data['name'], max_length=50)
                 
-                # Check for duplicate name
-                existing = self.categories.find_one({
-                    'user_id': user_id,
-                    'name': update_data['name'],
-                    '_id': {'$ne': category_id}
-                })
-                
-                if existing:
+                # Cannot modify default categories
+                query['is_default'] = {'$ne': True}
+            
+            # Update and fetch in a single round trip; the unique index rejects duplicate names
+            try:
+                category_doc = self.categories.find_one_and_update(
+                    query,
+                    {'$set': Category.update_fields(**update_data)},
+                    return_document=ReturnDocument.AFTER
+                )
+            except DuplicateKeyError:
+                return {
+                    'success': False,
+                    'message': 'Category with this name already exists'
+                }
+            
+            if not category_doc:
+                # Only a rename can be refused for an existing category
+                if 'name' in update_data and self._category_exists(category_id, user_id):
                     return {
                         'success': False,
-                        'message': 'Category with this name already exists'
+                        'message': 'Cannot modify default category name'
                     }
+                
+                return {
+                    'success': False,
+                    'message': 'Category not found'
+                }
             
-            # Update category
-            category.update(**update_data)
-            
-            # Save to database
-            self.categories.update_one(
-                {'_id': category_id},
-                {'$set': category.to_mongo()}
-            )
+            _invalidate_user_categories(user_id)
+            category = Category.from_mongo(category_doc)
             
             return {
                 'success': True,
@@ -274,54 +277,38 @@ class CategoryService:
         Delete a category
         
         Args:
-            category_id: Category's MongoDB ObjectId or string
-            user_id: User's MongoDB ObjectId or string
+            category_id: Category's MongoDB ObjectId
+            user_id: User's MongoDB ObjectId
         
         Returns:
             dict: Success status or error message
         """
         try:
-            if isinstance(category_id, str):
-                category_id = ObjectId(category_id)
-            if isinstance(user_id, str):
-                user_id = ObjectId(user_id)
-            
-            category_doc = self.categories.find_one({
-                '_id': category_id,
-                'user_id': user_id
-            })
-            
-            if not category_doc:
-                return {
-                    'success': False,
-                    'message': 'Category not found'
-                }
-            
-            category = Category.from_mongo(category_doc)
-            
-            # Cannot delete default categories
-            if category.is_default:
-                return {
-                    'success': False,
-                    'message': 'Cannot delete default category'
-                }
-            
-            # Delete category
+            # Default categories are protected by the delete filter itself
             result = self.categories.delete_one({
                 '_id': category_id,
-                'user_id': user_id
+                'user_id': user_id,
+                'is_default': {'$ne': True}
             })
             
             if result.deleted_count > 0:
+                _invalidate_user_categories(user_id)
                 return {
                     'success': True,
                     'message': 'Category deleted successfully'
                 }
-            else:
+            
+            # Nothing deleted: tell a default category apart from a missing one
+            if self._category_exists(category_id, user_id):
                 return {
                     'success': False,
-                    'message': 'Category not found'
+                    'message': 'Cannot delete default category'
                 }
+            
+            return {
+                'success': False,
+                'message': 'Category not found'
+            }
         
         except Exception as e:
             return {
@@ -329,12 +316,24 @@ class CategoryService:
                 'message': f'Failed to delete category: {str(e)}'
             }
     
+    def _category_exists(self, category_id, user_id):
+        """
+        Check whether a category exists for a user
+        
+        Only used to pick the error message after a guarded write
+        matched nothing.
+        """
+        return self.categories.find_one(
+            {'_id': category_id, 'user_id': user_id},
+            {'_id': 1}
+        ) is not None
+    
     def get_category_spending(self, user_id, category_name, start_date=None, end_date=None):
         """
         Get total spending for a category
         
         Args:
-            user_id: User's MongoDB ObjectId or string
+            user_id: User's MongoDB ObjectId
             category_name: Category name
             start_date: Start date for filtering
             end_date: End date for filtering
@@ -343,13 +342,6 @@ class CategoryService:
             dict: Category spending data
         """
         try:
-            from backend.utils.db_connection import get_expenses_collection
-            
-            if isinstance(user_id, str):
-                user_id = ObjectId(user_id)
-            
-            expenses = get_expenses_collection()
-            
             # Build query
             query = {
                 'user_id': user_id,
@@ -376,7 +368,9 @@ class CategoryService:
                 }}
             ]
             
-            result = list(expenses.aggregate(pipeline))
+            result = list(self.expenses.aggregate(
+                pipeline, **query_hint(EXPENSES_USER_CATEGORY_INDEX)
+            ))
             
             if result:
                 return {
@@ -400,3 +394,7 @@ class CategoryService:
                 'success': False,
                 'message': f'Failed to get category spending: {str(e)}'
             }
+
+
+# Shared instance; the service holds no per-request state
+category_service = CategoryService()
@@ -3,33 +3,217 @@ Expense Service - Handles expense CRUD operations
 """
 
 from backend.models.expense_model import Expense
-from backend.utils.db_connection import get_expenses_collection
+from backend.utils.db_connection import (
+    get_expenses_collection, get_expense_stats_monthly_collection,
+    get_expense_stats_state_collection,
+    get_expenses_read_collection, get_expense_stats_monthly_read_collection,
+    query_hint, EXPENSES_USER_DATE_INDEX
+)
 from backend.utils.validation import validate_amount, is_valid_object_id
-from bson import ObjectId
-from datetime import datetime, timedelta
+from backend.utils.logger import get_logger
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, PyMongoError
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from cachetools import TTLCache
+import threading
+
+
+logger = get_logger(__name__)
+
+# _id of the expense_stats_state document written once a full rollup
+# rebuild has run; the other documents there mark users whose rollup
+# rows missed an update
+ROLLUP_BACKFILL_ID = 'backfill'
+
+# Fields needed to render expense lists; heavy fields such as
+# receipt_url and tags are only returned by get_expense_by_id, and list
+# responses omit the keys left out here
+LIST_PROJECTION = {
+    'amount': 1,
+    'category': 1,
+    'payment_type': 1,
+    'date': 1,
+    'notes': 1
+}
+
+# Maximum documents per insert_many call in create_expenses_bulk
+BULK_INSERT_CHUNK_SIZE = 5_000
+
+
+@lru_cache(maxsize=4096)
+def _parse_iso(value):
+    """Parse an ISO date filter; clients repeat the same few bounds"""
+    return datetime.fromisoformat(value)
+
+
+# Expense list filters: (filter key, query field, operator, coercion).
+# Range filters sharing a field merge into one operator dict.
+FILTER_SPEC = [
+    ('start_date', 'date', '$gte', _parse_iso),
+    ('end_date', 'date', '$lte', _parse_iso),
+    ('category', 'category', None, str),
+    ('payment_type', 'payment_type', None, str),
+    ('min_amount', 'amount', '$gte', float),
+    ('max_amount', 'amount', '$lte', float),
+    ('tags', 'tags', '$in', list)
+]
+
+
+# Fields whose change moves an expense between monthly rollup rows
+STATS_FIELDS = frozenset(['amount', 'category', 'payment_type', 'date'])
+
+# Per-category and per-payment-type summary, fed rows shaped
+# {category, payment_type, total, count} from the rollup and/or raw expenses
+STATS_SUMMARY_STAGES = [
+    {'$facet': {
+        'by_category': [
+            {'$group': {
+                '_id': '$category',
+                'total': {'$sum': '$total'},
+                'count': {'$sum': '$count'}
+            }},
+            {'$match': {'count': {'$gt': 0}}},
+            {'$sort': {'total': -1}}
+        ],
+        'by_payment_type': [
+            {'$group': {
+                '_id': '$payment_type',
+                'total': {'$sum': '$total'},
+                'count': {'$sum': '$count'}
+            }},
+            {'$match': {'count': {'$gt': 0}}},
+            {'$project': {
+                '_id': 0,
+                'payment_type': '$_id',
+                'total': {'$round': ['$total', 2]},
+                'count': 1
+            }}
+        ]
+    }},
+    {'$addFields': {
+        'total_spent': {'$sum': '$by_category.total'},
+        'total_transactions': {'$sum': '$by_category.count'}
+    }},
+    {'$project': {
+        'total_spent': {'$round': ['$total_spent', 2]},
+        'total_transactions': 1,
+        'average_transaction': {'$cond': [
+            {'$gt': ['$total_transactions', 0]},
+            {'$round': [{'$divide': ['$total_spent', '$total_transactions']}, 2]},
+            0
+        ]},
+        'by_category': {'$map': {
+            'input': '$by_category',
+            'as': 'stat',
+            'in': {
+                'category': '$$stat._id',
+                'total': {'$round': ['$$stat.total', 2]},
+                'count': '$$stat.count',
+                'average': {'$round': [{'$divide': ['$$stat.total', '$$stat.count']}, 2]},
+                'percentage': {'$cond': [
+                    {'$gt': ['$total_spent', 0]},
+                    {'$round': [
+                        {'$multiply': [{'$divide': ['$$stat.total', '$total_spent']}, 100]},
+                        2
+                    ]},
+                    0
+                ]}
+            }
+        }},
+        'by_payment_type': 1
+    }}
+]
+
+
+def _to_utc(value):
+    """Naive UTC datetime, the form MongoDB stores and $year/$month use"""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _month_start(value):
+    """First instant of the month containing value"""
+    return value.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def _next_month(month_start):
+    """First instant of the month after month_start"""
+    return (month_start + timedelta(days=32)).replace(day=1)
+
+
+def _raw_stats_rows(match):
+    """Pipeline turning matching expenses into rollup-shaped rows"""
+    return [
+        {'$match': match},
+        {'$group': {
+            '_id': {'category': '$category', 'payment_type': '$payment_type'},
+            'total': {'$sum': '$amount'},
+            'count': {'$sum': 1}
+        }},
+        {'$project': {
+            '_id': 0,
+            'category': '$_id.category',
+            'payment_type': '$_id.payment_type',
+            'total': 1,
+            'count': 1
+        }}
+    ]
+
+
+# Unfiltered expense count per user, kept in step by create/delete so the
+# default listing skips count_documents. Every adjustment bumps the
+# generation; a count that started before one is not cached, since it
+# may predate the write.
+_count_cache = TTLCache(maxsize=10_000, ttl=30)
+_count_cache_generation = 0
+_count_cache_lock = threading.Lock()
+
+
+def _adjust_cached_count(user_id, delta):
+    """Apply a delta to a user's cached expense count if present"""
+    global _count_cache_generation
+    with _count_cache_lock:
+        _count_cache_generation += 1
+        count = _count_cache.get(user_id)
+        if count is not None:
+            _count_cache[user_id] = count + delta
+
+
+# Users whose rollup was last seen usable, so statistics reads skip the
+# expense_stats_state lookup. Stale marks from other processes are seen
+# once the entry expires; local ones drop it and bump the generation so
+# a lookup already in flight does not store an outdated answer.
+_rollup_ok_cache = TTLCache(maxsize=10_000, ttl=30)
+_rollup_generation = 0
+_rollup_repairs = set()
+_rollup_lock = threading.Lock()
 
 
 class ExpenseService:
     """Service class for expense operations"""
     
+    # Set once the backfill marker has been seen; it is never removed
+    _rollup_backfilled = False
+    
     def __init__(self):
         self.expenses = get_expenses_collection()
+        self.monthly_stats = get_expense_stats_monthly_collection()
+        self.stats_state = get_expense_stats_state_collection()
     
     def create_expense(self, user_id, expense_data):
         """
         Create a new expense
         
         Args:
-            user_id: User's MongoDB ObjectId or string
+            user_id: User's MongoDB ObjectId
             expense_data (dict): Expense details
         
         Returns:
             dict: Success status and created expense or error message
         """
         try:
-            if isinstance(user_id, str):
-                user_id = ObjectId(user_id)
-            
             # Validate amount
             is_valid, amount, message = validate_amount(expense_data.get('amount'))
             if not is_valid:
@@ -51,7 +235,10 @@ class ExpenseService:
             )
             
             # Insert into database
-            result = self.expenses.insert_one(expense.to_mongo())
+            expense_doc = expense.to_mongo()
+            result = self.expenses.insert_one(expense_doc)
+            _adjust_cached_count(user_id, 1)
+            self._record_monthly_stats(added=[expense_doc])
             
             # Get created expense
             created_expense = self.expenses.find_one({'_id': result.inserted_id})
@@ -69,12 +256,78 @@ class ExpenseService:
                 'message': f'Failed to create expense: {str(e)}'
             }
     
+    def create_expenses_bulk(self, user_id, expenses_data):
+        """
+        Create many expenses with batched inserts
+        
+        All rows are validated before anything is written; a single
+        invalid row rejects the whole batch.
+        
+        Args:
+            user_id: User's MongoDB ObjectId
+            expenses_data (list): Expense details, one dict per expense
+        
+        Returns:
+            dict: Success status and number of inserted expenses or error message
+        """
+        try:
+            docs = []
+            for index, expense_data in enumerate(expenses_data):
+                is_valid, amount, message = validate_amount(expense_data.get('amount'))
+                if not is_valid:
+                    return {
+                        'success': False,
+                        'message': f'Expense {index}: {message}'
+                    }
+                
+                docs.append(Expense(
+                    user_id=user_id,
+                    amount=amount,
+                    category=expense_data.get('category'),
+                    payment_type=expense_data.get('payment_type'),
+                    date=expense_data.get('date'),
+                    notes=expense_data.get('notes', ''),
+                    tags=expense_data.get('tags', []),
+                    receipt_url=expense_data.get('receipt_url')
+                ).to_mongo())
+            
+            # One round trip per chunk keeps each request well under the 16MB cap
+            inserted = 0
+            try:
+                for start in range(0, len(docs), BULK_INSERT_CHUNK_SIZE):
+                    chunk = docs[start:start + BULK_INSERT_CHUNK_SIZE]
+                    try:
+                        self.expenses.insert_many(chunk, ordered=False)
+                    except BulkWriteError as e:
+                        failed = {error['index'] for error in e.details.get('writeErrors', [])}
+                        written = [doc for index, doc in enumerate(chunk) if index not in failed]
+                        inserted += len(written)
+                        self._record_monthly_stats(added=written)
+                        raise
+                    
+                    inserted += len(chunk)
+                    self._record_monthly_stats(added=chunk)
+            finally:
+                _adjust_cached_count(user_id, inserted)
+            
+            return {
+                'success': True,
+                'message': f'{inserted} expenses created successfully',
+                'inserted': inserted
+            }
+        
+        except Exception as e:
+            return {
+                'success': False,
+                'message': f'Failed to create expenses: {str(e)}'
+            }
+    
     def get_user_expenses(self, user_id, filters=None, page=1, limit=50):
         """
         Get user's expenses with optional filters
         
         Args:
-            user_id: User's MongoDB ObjectId or string
+            user_id: User's MongoDB ObjectId
             filters (dict, optional): Filter parameters
             page (int): Page number
             limit (int): Items per page
@@ -83,56 +336,41 @@ class ExpenseService:
             dict: Expenses list and metadata
         """
         try:
-            if isinstance(user_id, str):
-                user_id = ObjectId(user_id)
-            
             # Build query
             query = {'user_id': user_id}
             
             if filters:
-                # Date range filter
-                if 'start_date' in filters:
-                    start_date = datetime.fromisoformat(filters['start_date'])
-                    query['date'] = {'$gte': start_date}
-                
-                if 'end_date' in filters:
-                    end_date = datetime.fromisoformat(filters['end_date'])
-                    if 'date' in query:
-                        query['date']['$lte'] = end_date
-                    else:
-                        query['date'] = {'$lte': end_date}
-                
-                # Category filter
-                if 'category' in filters:
-                    query['category'] = filters['category']
-                
-                # Payment type filter
-                if 'payment_type' in filters:
-                    query['payment_type'] = filters['payment_type']
-                
-                # Amount range filter
-                if 'min_amount' in filters:
-                    query['amount'] = {'$gte': float(filters['min_amount'])}
-                
-                if 'max_amount' in filters:
-                    if 'amount' in query:
-                        query['amount']['$lte'] = float(filters['max_amount'])
-                    else:
-                        query['amount'] = {'$lte': float(filters['max_amount'])}
-                
-                # Tags filter
-                if 'tags' in filters:
-                    query['tags'] = {'$in': filters['tags']}
-            
-            # Calculate pagination
+                for key, field, op, coerce in FILTER_SPEC:
+                    if key in filters:
+                        value = coerce(filters[key])
+                        if op:
+                            query.setdefault(field, {})[op] = value
+                        else:
+                            query[field] = value
+            
+            # Calculate pagination; skip and batch_size reject negative values
+            page = max(page, 1)
+            limit = max(limit, 1)
             skip = (page - 1) * limit
             
             # Get expenses
-            cursor = self.expenses.find(query).sort('date', -1).skip(skip).limit(limit)
-            expenses_list = [Expense.from_mongo(doc).to_dict() for doc in cursor]
+            cursor = (self.expenses.find(query, LIST_PROJECTION)
+                      .sort('date', -1).skip(skip).limit(limit).batch_size(limit))
+            expenses_list = Expense.docs_to_dicts(cursor, LIST_PROJECTION)
             
             # Get total count
-            total_count = self.expenses.count_documents(query)
+            if filters:
+                total_count = self.expenses.count_documents(query)
+            else:
+                with _count_cache_lock:
+                    total_count = _count_cache.get(user_id)
+                    generation = _count_cache_generation
+                
+                if total_count is None:
+                    total_count = self.expenses.count_documents(query)
+                    with _count_cache_lock:
+                        if generation == _count_cache_generation:
+                            _count_cache[user_id] = total_count
             
             return {
                 'success': True,
@@ -157,18 +395,13 @@ class ExpenseService:
         Get single expense by ID
         
         Args:
-            expense_id: Expense's MongoDB ObjectId or string
-            user_id: User's MongoDB ObjectId or string
+            expense_id: Expense's MongoDB ObjectId
+            user_id: User's MongoDB ObjectId
         
         Returns:
             dict: Expense data or error message
         """
         try:
-            if isinstance(expense_id, str):
-                expense_id = ObjectId(expense_id)
-            if isinstance(user_id, str):
-                user_id = ObjectId(user_id)
-            
             expense_doc = self.expenses.find_one({
                 '_id': expense_id,
                 'user_id': user_id
@@ -180,11 +413,9 @@ class ExpenseService:
                     'message': 'Expense not found'
                 }
             
-            expense = Expense.from_mongo(expense_doc)
-            
             return {
                 'success': True,
-                'expense': expense.to_dict()
+                'expense': Expense.docs_to_dicts([expense_doc])[0]
             }
         
         except Exception as e:
@@ -198,32 +429,14 @@ class ExpenseService:
         Update an expense
         
         Args:
-            expense_id: Expense's MongoDB ObjectId or string
-            user_id: User's MongoDB ObjectId or string
+            expense_id: Expense's MongoDB ObjectId
+            user_id: User's MongoDB ObjectId
             update_data (dict): Fields to update
         
         Returns:
             dict: Success status and updated expense or error message
         """
         try:
-            if isinstance(expense_id, str):
-                expense_id = ObjectId(expense_id)
-            if isinstance(user_id, str):
-                user_id = ObjectId(user_id)
-            
-            expense_doc = self.expenses.find_one({
-                '_id': expense_id,
-                'user_id': user_id
-            })
-            
-            if not expense_doc:
-                return {
-                    'success': False,
-                    'message': 'Expense not found'
-                }
-            
-            expense = Expense.from_mongo(expense_doc)
-            
             # Validate amount if provided
             if 'amount' in update_data:
                 is_valid, amount, message = validate_amount(update_data['amount'])
@@ -234,15 +447,27 @@ class ExpenseService:
                     }
                 update_data['amount'] = amount
             
-            # Update expense
-            expense.update(**update_data)
-            
-            # Save to database
-            self.expenses.update_one(
-                {'_id': expense_id},
-                {'$set': expense.to_mongo()}
+            # Update in a single round trip; the previous version is needed
+            # to move the expense between monthly rollup rows
+            fields = Expense.update_fields(**update_data)
+            previous_doc = self.expenses.find_one_and_update(
+                {'_id': expense_id, 'user_id': user_id},
+                {'$set': fields},
+                return_document=ReturnDocument.BEFORE
             )
             
+            if not previous_doc:
+                return {
+                    'success': False,
+                    'message': 'Expense not found'
+                }
+            
+            expense_doc = {**previous_doc, **fields}
+            if STATS_FIELDS.intersection(fields):
+                self._record_monthly_stats(added=[expense_doc], removed=[previous_doc])
+            
+            expense = Expense.from_mongo(expense_doc)
+            
             return {
                 'success': True,
                 'message': 'Expense updated successfully',
@@ -260,24 +485,21 @@ class ExpenseService:
         Delete an expense
         
         Args:
-            expense_id: Expense's MongoDB ObjectId or string
-            user_id: User's MongoDB ObjectId or string
+            expense_id: Expense's MongoDB ObjectId
+            user_id: User's MongoDB ObjectId
         
         Returns:
             dict: Success status or error message
         """
         try:
-            if isinstance(expense_id, str):
-                expense_id = ObjectId(expense_id)
-            if isinstance(user_id, str):
-                user_id = ObjectId(user_id)
-            
-            result = self.expenses.delete_one({
-                '_id': expense_id,
-                'user_id': user_id
-            })
+            deleted_doc = self.expenses.find_one_and_delete(
+                {'_id': expense_id, 'user_id': user_id},
+                projection={field: 1 for field in STATS_FIELDS | {'user_id'}}
+            )
             
-            if result.deleted_count > 0:
+            if deleted_doc:
+                _adjust_cached_count(user_id, -1)
+                self._record_monthly_stats(removed=[deleted_doc])
                 return {
                     'success': True,
                     'message': 'Expense deleted successfully'
@@ -298,8 +520,11 @@ class ExpenseService:
         """
         Get expense statistics for a user
         
+        Dashboard reads go through the read client and may lag the primary
+        slightly on replica sets.
+        
         Args:
-            user_id: User's MongoDB ObjectId or string
+            user_id: User's MongoDB ObjectId
             start_date (datetime, optional): Start date for statistics
             end_date (datetime, optional): End date for statistics
         
@@ -307,105 +532,296 @@ class ExpenseService:
             dict: Statistics data
         """
         try:
-            if isinstance(user_id, str):
-                user_id = ObjectId(user_id)
-            
             # Default to current month
             if not start_date:
                 start_date = datetime.utcnow().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
             if not end_date:
                 end_date = datetime.utcnow()
-            
-            # Build query
-            query = {
-                'user_id': user_id,
-                'date': {'$gte': start_date, '$lte': end_date}
+            period = {
+                'start_date': start_date.isoformat(),
+                'end_date': end_date.isoformat()
             }
             
-            # Aggregation pipeline
-            pipeline = [
-                {'$match': query},
-                {'$group': {
-                    '_id': '$category',
-                    'total': {'$sum': '$amount'},
-                    'count': {'$sum': 1},
-                    'average': {'$avg': '$amount'}
-                }},
-                {'$sort': {'total': -1}}
-            ]
-            
-            category_stats = list(self.expenses.aggregate(pipeline))
+            # Month boundaries are UTC, matching the rollup rows
+            start_date = _to_utc(start_date)
+            end_date = _to_utc(end_date)
+            
+            # Whole months are read from the monthly rollup; the partial
+            # months at either edge of the range come from raw expenses
+            full_start = _month_start(start_date)
+            if full_start < start_date:
+                full_start = _next_month(full_start)
+            full_end = _month_start(end_date + timedelta(milliseconds=1))
+            
+            if full_start < full_end and self._rollup_usable(user_id):
+                edges = []
+                if start_date < full_start:
+                    edges.append({'date': {'$gte': start_date, '$lt': full_start}})
+                if full_end <= end_date:
+                    edges.append({'date': {'$gte': full_end, '$lte': end_date}})
+                
+                pipeline = [
+                    {'$match': {
+                        'user_id': user_id,
+                        'month': {'$gte': full_start, '$lt': full_end}
+                    }},
+                    {'$project': {'_id': 0, 'category': 1, 'payment_type': 1, 'total': 1, 'count': 1}}
+                ]
+                if edges:
+                    pipeline.append({'$unionWith': {
+                        'coll': self.expenses.name,
+                        'pipeline': _raw_stats_rows({'user_id': user_id, '$or': edges})
+                    }})
+                
+                cursor = get_expense_stats_monthly_read_collection().aggregate(
+                    pipeline + STATS_SUMMARY_STAGES
+                )
+            else:
+                pipeline = _raw_stats_rows({
+                    'user_id': user_id,
+                    'date': {'$gte': start_date, '$lte': end_date}
+                })
+                cursor = get_expenses_read_collection().aggregate(
+                    pipeline + STATS_SUMMARY_STAGES, **query_hint(EXPENSES_USER_DATE_INDEX)
+                )
+            
+            # $facet always yields exactly one summary document
+            summary = next(cursor)
+            summary['period'] = period
             
-            # Calculate total
-            total_spent = sum(stat['total'] for stat in category_stats)
-            total_transactions = sum(stat['count'] for stat in category_stats)
+            return {
+                'success': True,
+                'statistics': summary
+            }
+        
+        except Exception as e:
+            return {
+                'success': False,
+                'message': f'Failed to get statistics: {str(e)}'
+            }
+    
+    def rebuild_monthly_stats(self, user_id=None):
+        """
+        Recompute the monthly statistics rollup from raw expenses
+        
+        Repairs drift left by interrupted writes and backfills expenses
+        created before the rollup existed. Rows are merged in place and
+        only then are rows this run did not produce removed, so readers
+        never see an empty rollup. Rows written while the rebuild ran are
+        kept and their users marked stale for another pass, since the
+        rebuilt totals may or may not include those writes.
+        
+        Args:
+            user_id (optional): Only rebuild this user's rows
+        
+        Returns:
+            dict: Success status or error message
+        """
+        try:
+            match = {'user_id': user_id} if user_id else {}
+            started = datetime.utcnow()
+            written_during_run = {'$gte': ['$written_at', started]}
             
-            # Payment type breakdown
-            payment_pipeline = [
-                {'$match': query},
+            self.expenses.aggregate([
+                {'$match': match},
                 {'$group': {
-                    '_id': '$payment_type',
+                    '_id': {
+                        'user_id': '$user_id',
+                        # Dates are stored as UTC, so this is the UTC month
+                        'month': {'$dateFromParts': {
+                            'year': {'$year': '$date'},
+                            'month': {'$month': '$date'}
+                        }},
+                        'category': '$category',
+                        'payment_type': '$payment_type'
+                    },
                     'total': {'$sum': '$amount'},
                     'count': {'$sum': 1}
+                }},
+                {'$project': {
+                    '_id': 0,
+                    'user_id': '$_id.user_id',
+                    'month': '$_id.month',
+                    'category': '$_id.category',
+                    'payment_type': '$_id.payment_type',
+                    'total': 1,
+                    'count': 1,
+                    'rebuilt_at': {'$literal': started}
+                }},
+                {'$merge': {
+                    'into': self.monthly_stats.name,
+                    'on': ['user_id', 'month', 'category', 'payment_type'],
+                    'whenMatched': [{'$replaceWith': {
+                        '$cond': [written_during_run, '$$ROOT', '$$new']
+                    }}],
+                    'whenNotMatched': 'insert'
                 }}
-            ]
+            ])
             
-            payment_stats = list(self.expenses.aggregate(payment_pipeline))
+            # Rows with no expenses behind them any more
+            self.monthly_stats.delete_many({
+                **match,
+                'rebuilt_at': {'$ne': started},
+                'written_at': {'$not': {'$gte': started}}
+            })
+            
+            # Clear stale marks the rebuild covered; marks set while it ran stay
+            stale = {'marked_at': {'$lt': started}}
+            if user_id:
+                self.stats_state.delete_one({'_id': user_id, **stale})
+            else:
+                self.stats_state.delete_many({'_id': {'$ne': ROLLUP_BACKFILL_ID}, **stale})
+                self.stats_state.update_one(
+                    {'_id': ROLLUP_BACKFILL_ID},
+                    {'$set': {'completed_at': datetime.utcnow()}},
+                    upsert=True
+                )
+            
+            self._mark_rollup_stale(set(self.monthly_stats.distinct(
+                'user_id', {**match, 'written_at': {'$gte': started}}
+            )))
             
             return {
                 'success': True,
-                'statistics': {
-                    'total_spent': round(total_spent, 2),
-                    'total_transactions': total_transactions,
-                    'average_transaction': round(total_spent / total_transactions, 2) if total_transactions > 0 else 0,
-                    'by_category': [
-                        {
-                            'category': stat['_id'],
-                            'total': round(stat['total'], 2),
-                            'count': stat['count'],
-                            'average': round(stat['average'], 2),
-                            'percentage': round((stat['total'] / total_spent) * 100, 2) if total_spent > 0 else 0
-                        }
-                        for stat in category_stats
-                    ],
-                    'by_payment_type': [
-                        {
-                            'payment_type': stat['_id'],
-                            'total': round(stat['total'], 2),
-                            'count': stat['count']
-                        }
-                        for stat in payment_stats
-                    ],
-                    'period': {
-                        'start_date': start_date.isoformat(),
-                        'end_date': end_date.isoformat()
-                    }
-                }
+                'message': 'Monthly statistics rebuilt successfully'
             }
         
         except Exception as e:
             return {
                 'success': False,
-                'message': f'Failed to get statistics: {str(e)}'
+                'message': f'Failed to rebuild monthly statistics: {str(e)}'
             }
     
+    def _record_monthly_stats(self, added=(), removed=()):
+        """
+        Apply added/removed expense documents to the monthly rollup
+        
+        Deltas are merged per rollup row and sent as one bulk write. A
+        failure here leaves the expense write in place and marks the
+        affected users stale, so their statistics are rebuilt before the
+        rollup is read again.
+        """
+        user_ids = {doc.get('user_id') for docs in (added, removed) for doc in docs}
+        user_ids.discard(None)
+        
+        try:
+            # Legacy or partial documents may lack a field; the expense
+            # write has already happened, so any failure only marks stale
+            now = datetime.utcnow()
+            deltas = {}
+            for docs, sign in ((added, 1), (removed, -1)):
+                for doc in docs:
+                    month = _month_start(_to_utc(doc['date']))
+                    key = (doc['user_id'], month, doc['category'], doc['payment_type'])
+                    total, count = deltas.get(key, (0, 0))
+                    deltas[key] = (total + sign * doc['amount'], count + sign)
+            
+            operations = [
+                UpdateOne(
+                    {'user_id': key[0], 'month': key[1], 'category': key[2], 'payment_type': key[3]},
+                    {'$inc': {'total': total, 'count': count}, '$set': {'written_at': now}},
+                    upsert=True
+                )
+                for key, (total, count) in deltas.items()
+                if count or total
+            ]
+            
+            if operations:
+                self.monthly_stats.bulk_write(operations, ordered=False)
+        except Exception as e:
+            logger.error('Failed to update monthly statistics: %s', e)
+            self._mark_rollup_stale(user_ids)
+    
+    def _mark_rollup_stale(self, user_ids):
+        """Record that these users' rollup rows missed an update"""
+        global _rollup_generation
+        if not user_ids:
+            return
+        
+        with _rollup_lock:
+            _rollup_generation += 1
+            for user_id in user_ids:
+                _rollup_ok_cache.pop(user_id, None)
+        
+        now = datetime.utcnow()
+        try:
+            self.stats_state.bulk_write([
+                UpdateOne({'_id': user_id}, {'$set': {'marked_at': now}}, upsert=True)
+                for user_id in user_ids
+            ], ordered=False)
+        except PyMongoError as e:
+            logger.error(
+                'Failed to mark monthly statistics stale for %s: %s; '
+                'run rebuild_monthly_stats to repair', sorted(map(str, user_ids)), e
+            )
+    
+    def _rollup_usable(self, user_id):
+        """
+        Whether the monthly rollup can answer for this user
+        
+        False until the rollup has been backfilled, so deployments that
+        predate it fall back to raw aggregation. A user marked stale gets
+        a rebuild on a background thread and is served from raw
+        aggregation until the mark is gone.
+        """
+        with _rollup_lock:
+            if _rollup_ok_cache.get(user_id):
+                return True
+            generation = _rollup_generation
+        
+        ids = [user_id] if ExpenseService._rollup_backfilled else [ROLLUP_BACKFILL_ID, user_id]
+        found = {doc['_id'] for doc in self.stats_state.find({'_id': {'$in': ids}}, {'_id': 1})}
+        
+        if not ExpenseService._rollup_backfilled:
+            if ROLLUP_BACKFILL_ID not in found:
+                return False
+            ExpenseService._rollup_backfilled = True
+        
+        if user_id in found:
+            self._schedule_rollup_repair(user_id)
+            return False
+        
+        with _rollup_lock:
+            if generation == _rollup_generation:
+                _rollup_ok_cache[user_id] = True
+        return True
+    
+    def _schedule_rollup_repair(self, user_id):
+        """Rebuild a stale user's rollup off the request path, once at a time"""
+        with _rollup_lock:
+            if user_id in _rollup_repairs:
+                return
+            _rollup_repairs.add(user_id)
+        
+        def repair():
+            try:
+                result = self.rebuild_monthly_stats(user_id)
+                if not result['success']:
+                    logger.error('Monthly statistics repair for %s failed: %s', user_id, result['message'])
+            finally:
+                with _rollup_lock:
+                    _rollup_repairs.discard(user_id)
+        
+        threading.Thread(target=repair, name='rollup-repair', daemon=True).start()
+    
     def get_recent_expenses(self, user_id, limit=10):
         """
         Get user's most recent expenses
         
         Args:
-            user_id: User's MongoDB ObjectId or string
+            user_id: User's MongoDB ObjectId
             limit (int): Number of expenses to return
         
         Returns:
             dict: Recent expenses list
         """
         try:
-            if isinstance(user_id, str):
-                user_id = ObjectId(user_id)
+            # batch_size rejects negative values
+            limit = max(limit, 1)
             
-            cursor = self.expenses.find({'user_id': user_id}).sort('date', -1).limit(limit)
-            expenses_list = [Expense.from_mongo(doc).to_dict() for doc in cursor]
+            cursor = (self.expenses.find({'user_id': user_id}, LIST_PROJECTION)
+                      .sort('date', -1).limit(limit).batch_size(limit))
+            expenses_list = Expense.docs_to_dicts(cursor, LIST_PROJECTION)
             
             return {
                 'success': True,
@@ -418,3 +834,41 @@ class ExpenseService:
                 'message': f'Failed to get recent expenses: {str(e)}',
                 'expenses': []
             }
+    
+    def get_recent_amounts_by_user(self, window=5, user_ids=None):
+        """
+        Get each user's latest expense amounts in one aggregation
+        
+        Feeds batch predictions (see ml.prediction.windows_from_amounts)
+        without a query per user. Runs on the read client; $topN needs
+        MongoDB 5.2 or later.
+        
+        Args:
+            window (int): Amounts to return per user
+            user_ids (list, optional): Restrict to these users
+        
+        Returns:
+            dict: Per-user amount lists, newest first
+        """
+        try:
+            pipeline = Expense.recent_amounts_pipeline(window, user_ids)
+            users = [
+                {'user_id': str(doc['_id']), 'amounts': doc['amounts']}
+                for doc in get_expenses_read_collection().aggregate(pipeline)
+            ]
+            
+            return {
+                'success': True,
+                'users': users
+            }
+        
+        except Exception as e:
+            return {
+                'success': False,
+                'message': f'Failed to get recent amounts: {str(e)}',
+                'users': []
+            }
+
+
+# Shared instance; the service holds no per-request state
+expense_service = ExpenseService()
@@ -3,10 +3,115 @@ Savings Service - Handles savings goals
 """
 
 from backend.models.savings_model import SavingsGoal
-from backend.utils.db_connection import get_savings_goals_collection
-from backend.utils.validation import validate_amount
+from backend.utils.db_connection import get_savings_goals_collection, query_hint, GOALS_OVERDUE_INDEX
+from backend.utils.validation import validate_amount, ensure_object_ids
 from bson import ObjectId
+from pymongo import ReturnDocument, UpdateOne
 from datetime import datetime
+from cachetools import TTLCache
+import threading
+
+
+# Fields needed to render goal lists; the free-text description is
+# only returned by get_goal_by_id, and list responses omit the keys
+# left out here
+GOAL_LIST_PROJECTION = {
+    'title': 1,
+    'target_amount': 1,
+    'saved_amount': 1,
+    'deadline': 1,
+    'priority': 1,
+    'status': 1,
+    'created_at': 1,
+    'updated_at': 1,
+    'completed_at': 1
+}
+
+
+# Goal detail lookups keyed by (user_id, goal_id), dropped on every write.
+# Short TTL bounds staleness of derived fields such as days_remaining.
+# Every invalidation bumps the generation; a goal read before one is not
+# cached, since it may predate the write.
+_goal_cache = TTLCache(maxsize=10_000, ttl=5)
+_goal_cache_generation = 0
+_goal_cache_lock = threading.Lock()
+
+
+def _invalidate_goal(user_id, goal_id):
+    """Drop a cached goal lookup"""
+    global _goal_cache_generation
+    with _goal_cache_lock:
+        _goal_cache_generation += 1
+        _goal_cache.pop((user_id, goal_id), None)
+
+
+# Pipeline-update stage reopening completed goals that fell below target
+_BELOW_TARGET = {'$and': [
+    {'$eq': ['$status', 'completed']},
+    {'$lt': ['$saved_amount', '$target_amount']}
+]}
+REACTIVATION_STAGE = {'$set': {
+    'status': {'$cond': [_BELOW_TARGET, 'active', '$status']},
+    'completed_at': {'$cond': [_BELOW_TARGET, None, '$completed_at']}
+}}
+
+
+def _completion_stage(now):
+    """Pipeline-update stage completing active goals that reached target"""
+    reached = {'$and': [
+        {'$eq': ['$status', 'active']},
+        {'$gte': ['$saved_amount', '$target_amount']}
+    ]}
+    return {'$set': {
+        'status': {'$cond': [reached, 'completed', '$status']},
+        'completed_at': {'$cond': [reached, now, '$completed_at']}
+    }}
+
+
+def _update_pipeline(fields, now):
+    """Pipeline update setting goal fields, then completing reached goals"""
+    return [
+        # Literal values so user text starting with '$' is not read as a field path
+        {'$set': {key: {'$literal': value} for key, value in fields.items()}},
+        _completion_stage(now)
+    ]
+
+
+# Goal counts and totals for a set of matched goals
+GOAL_SUMMARY_GROUP = {'$group': {
+    '_id': None,
+    'total_goals': {'$sum': 1},
+    'active_goals': {'$sum': {'$cond': [{'$eq': ['$status', 'active']}, 1, 0]}},
+    'completed_goals': {'$sum': {'$cond': [{'$eq': ['$status', 'completed']}, 1, 0]}},
+    'total_target': {'$sum': '$target_amount'},
+    'total_saved': {'$sum': '$saved_amount'}
+}}
+
+
+def _format_goal_summary(summary_docs):
+    """Shape GOAL_SUMMARY_GROUP output (zero or one document) for responses"""
+    if not summary_docs:
+        return {
+            'total_goals': 0,
+            'active_goals': 0,
+            'completed_goals': 0,
+            'total_target': 0,
+            'total_saved': 0,
+            'overall_progress': 0
+        }
+    
+    totals = summary_docs[0]
+    total_target = totals['total_target']
+    total_saved = totals['total_saved']
+    
+    return {
+        'total_goals': totals['total_goals'],
+        'active_goals': totals['active_goals'],
+        'completed_goals': totals['completed_goals'],
+        'total_target': round(total_target, 2),
+        'total_saved': round(total_saved, 2),
+        'overall_progress': round((total_saved / total_target * 100) if total_target > 0 else 0, 2)
+    }
 
 
 class SavingsService:
@@ -15,6 +120,7 @@ class SavingsService:
     def __init__(self):
         self.savings_goals = get_savings_goals_collection()
     
+    @ensure_object_ids('user_id')
     def create_goal(self, user_id, goal_data):
         """
         Create a new savings goal
@@ -27,9 +133,6 @@ class SavingsService:
             dict: Success status and created goal or error message
         """
         try:
-            if isinstance(user_id, str):
-                user_id = ObjectId(user_id)
-            
             # Validate target amount
             is_valid, amount, message = validate_amount(goal_data.get('target_amount'))
             if not is_valid:
@@ -49,12 +152,11 @@ class SavingsService:
                 priority=goal_data.get('priority', 'medium')
             )
             
-            # Insert into database
-            result = self.savings_goals.insert_one(goal.to_mongo())
-            
-            # Get created goal
-            created_goal = self.savings_goals.find_one({'_id': result.inserted_id})
-            goal_obj = SavingsGoal.from_mongo(created_goal)
+            # Insert into database and echo the document we just built
+            goal_doc = goal.to_mongo()
+            result = self.savings_goals.insert_one(goal_doc)
+            goal_doc['_id'] = result.inserted_id
+            goal_obj = SavingsGoal.from_mongo(goal_doc)
             
             return {
                 'success': True,
@@ -68,47 +170,67 @@ class SavingsService:
                 'message': f'Failed to create goal: {str(e)}'
             }
     
-    def get_user_goals(self, user_id, status=None):
+    @ensure_object_ids('user_id')
+    def get_user_goals(self, user_id, status=None, page=1, limit=50, count_only=False):
         """
         Get user's savings goals
         
         Args:
             user_id: User's MongoDB ObjectId or string
             status (str, optional): Filter by status
+            page (int): Page number
+            limit (int): Items per page
+            count_only (bool): Only count matching goals, without fetching them
         
         Returns:
-            dict: Goals list
+            dict: Goals page, summary over all matching goals, and pagination
+                  (or just the count when count_only is set)
         """
         try:
-            if isinstance(user_id, str):
-                user_id = ObjectId(user_id)
-            
             # Build query
             query = {'user_id': user_id}
             
             if status:
                 query['status'] = status
             
-            # Get goals
-            cursor = self.savings_goals.find(query).sort('created_at', -1)
-            goals_list = [SavingsGoal.from_mongo(doc).to_dict() for doc in cursor]
+            # Answered from the (user_id, status, ...) index alone
+            if count_only:
+                return {
+                    'success': True,
+                    'count': self.savings_goals.count_documents(query)
+                }
             
-            # Calculate summary
-            total_target = sum(goal['target_amount'] for goal in goals_list)
-            total_saved = sum(goal['saved_amount'] for goal in goals_list)
-            active_goals = len([g for g in goals_list if g['status'] == 'active'])
-            completed_goals = len([g for g in goals_list if g['status'] == 'completed'])
+            # $skip/$limit reject negative and zero values
+            page = max(page, 1)
+            limit = max(limit, 1)
+            
+            # One page of goals and the summary over all of them in one aggregation
+            result = next(self.savings_goals.aggregate([
+                {'$match': query},
+                {'$facet': {
+                    'goals': [
+                        {'$sort': {'created_at': -1}},
+                        {'$skip': (page - 1) * limit},
+                        {'$limit': limit},
+                        {'$project': GOAL_LIST_PROJECTION}
+                    ],
+                    'summary': [GOAL_SUMMARY_GROUP]
+                }}
+            ]))
+            
+            goals_list = SavingsGoal.docs_to_dicts(result['goals'], GOAL_LIST_PROJECTION)
+            summary = _format_goal_summary(result['summary'])
+            total_count = summary['total_goals']
             
             return {
                 'success': True,
                 'goals': goals_list,
-                'summary': {
-                    'total_goals': len(goals_list),
-                    'active_goals': active_goals,
-                    'completed_goals': completed_goals,
-                    'total_target': round(total_target, 2),
-                    'total_saved': round(total_saved, 2),
-                    'overall_progress': round((total_saved / total_target * 100) if total_target > 0 else 0, 2)
+                'summary': summary,
+                'pagination': {
+                    'page': page,
+                    'limit': limit,
+                    'total': total_count,
+                    'pages': (total_count + limit - 1) // limit
                 }
             }
         
@@ -119,6 +241,35 @@ class SavingsService:
                 'goals': []
             }
     
+    @ensure_object_ids('user_id')
+    def get_user_goals_summary(self, user_id):
+        """
+        Get goal counts and totals without the goals themselves
+        
+        Args:
+            user_id: User's MongoDB ObjectId or string
+        
+        Returns:
+            dict: Goals summary
+        """
+        try:
+            summary_docs = list(self.savings_goals.aggregate([
+                {'$match': {'user_id': user_id}},
+                GOAL_SUMMARY_GROUP
+            ]))
+            
+            return {
+                'success': True,
+                'summary': _format_goal_summary(summary_docs)
+            }
+        
+        except Exception as e:
+            return {
+                'success': False,
+                'message': f'Failed to get goals summary: {str(e)}'
+            }
+    
+    @ensure_object_ids('goal_id', 'user_id')
     def get_goal_by_id(self, goal_id, user_id):
         """
         Get single goal by ID
@@ -131,10 +282,15 @@ class SavingsService:
             dict: Goal data or error message
         """
         try:
-            if isinstance(goal_id, str):
-                goal_id = ObjectId(goal_id)
-            if isinstance(user_id, str):
-                user_id = ObjectId(user_id)
+            cache_key = (user_id, goal_id)
+            with _goal_cache_lock:
+                cached = _goal_cache.get(cache_key)
+                generation = _goal_cache_generation
+            if cached is not None:
+                return {
+                    'success': True,
+                    'goal': cached
+                }
             
             goal_doc = self.savings_goals.find_one({
                 '_id': goal_id,
@@ -147,11 +303,14 @@ class SavingsService:
                     'message': 'Goal not found'
                 }
             
-            goal = SavingsGoal.from_mongo(goal_doc)
+            goal_dict = SavingsGoal.from_mongo(goal_doc).to_dict()
+            with _goal_cache_lock:
+                if generation == _goal_cache_generation:
+                    _goal_cache[cache_key] = goal_dict
             
             return {
                 'success': True,
-                'goal': goal.to_dict()
+                'goal': goal_dict
             }
         
         except Exception as e:
@@ -160,6 +319,7 @@ class SavingsService:
                 'message': f'Failed to get goal: {str(e)}'
             }
     
+    @ensure_object_ids('goal_id', 'user_id')
     def update_goal(self, goal_id, user_id, update_data):
         """
         Update a savings goal
@@ -173,24 +333,6 @@ class SavingsService:
             dict: Success status and updated goal or error message
         """
         try:
-            if isinstance(goal_id, str):
-                goal_id = ObjectId(goal_id)
-            if isinstance(user_id, str):
-                user_id = ObjectId(user_id)
-            
-            goal_doc = self.savings_goals.find_one({
-                '_id': goal_id,
-                'user_id': user_id
-            })
-            
-            if not goal_doc:
-                return {
-                    'success': False,
-                    'message': 'Goal not found'
-                }
-            
-            goal = SavingsGoal.from_mongo(goal_doc)
-            
             # Validate amounts if provided
             if 'target_amount' in update_data:
                 is_valid, amount, message = validate_amount(update_data['target_amount'])
@@ -210,15 +352,23 @@ class SavingsService:
                     }
                 update_data['saved_amount'] = amount
             
-            # Update goal
-            goal.update(**update_data)
-            
-            # Save to database
-            self.savings_goals.update_one(
-                {'_id': goal_id},
-                {'$set': goal.to_mongo()}
+            # Update, complete if the target is reached, and fetch in one round trip
+            now = datetime.utcnow()
+            goal_doc = self.savings_goals.find_one_and_update(
+                {'_id': goal_id, 'user_id': user_id},
+                _update_pipeline(SavingsGoal.update_fields(now=now, **update_data), now),
+                return_document=ReturnDocument.AFTER
             )
             
+            if not goal_doc:
+                return {
+                    'success': False,
+                    'message': 'Goal not found'
+                }
+            
+            goal = SavingsGoal.from_mongo(goal_doc)
+            _invalidate_goal(user_id, goal_id)
+            
             return {
                 'success': True,
                 'message': 'Goal updated successfully',
@@ -231,6 +381,7 @@ class SavingsService:
                 'message': f'Failed to update goal: {str(e)}'
             }
     
+    @ensure_object_ids('goal_id', 'user_id')
     def add_savings(self, goal_id, user_id, amount, notes=''):
         """
         Add money to a savings goal
@@ -245,11 +396,6 @@ class SavingsService:
             dict: Success status and updated goal or error message
         """
         try:
-            if isinstance(goal_id, str):
-                goal_id = ObjectId(goal_id)
-            if isinstance(user_id, str):
-                user_id = ObjectId(user_id)
-            
             # Validate amount
             is_valid, amount, message = validate_amount(amount)
             if not is_valid:
@@ -258,10 +404,19 @@ class SavingsService:
                     'message': message
                 }
             
-            goal_doc = self.savings_goals.find_one({
-                '_id': goal_id,
-                'user_id': user_id
-            })
+            # Add savings and complete the goal in one atomic pipeline update
+            now = datetime.utcnow()
+            goal_doc = self.savings_goals.find_one_and_update(
+                {'_id': goal_id, 'user_id': user_id},
+                [
+                    {'$set': {
+                        'saved_amount': {'$add': ['$saved_amount', amount]},
+                        'updated_at': now
+                    }},
+                    _completion_stage(now)
+                ],
+                return_document=ReturnDocument.AFTER
+            )
             
             if not goal_doc:
                 return {
@@ -270,21 +425,13 @@ class SavingsService:
                 }
             
             goal = SavingsGoal.from_mongo(goal_doc)
-            
-            # Add savings
-            new_total = goal.add_savings(amount)
-            
-            # Save to database
-            self.savings_goals.update_one(
-                {'_id': goal_id},
-                {'$set': goal.to_mongo()}
-            )
+            _invalidate_goal(user_id, goal_id)
             
             return {
                 'success': True,
                 'message': f'Added ${amount:.2f} to savings',
                 'goal': goal.to_dict(),
-                'new_total': new_total
+                'new_total': goal.saved_amount
             }
         
         except Exception as e:
@@ -293,6 +440,7 @@ class SavingsService:
                 'message': f'Failed to add savings: {str(e)}'
             }
     
+    @ensure_object_ids('goal_id', 'user_id')
     def withdraw_savings(self, goal_id, user_id, amount, notes=''):
         """
         Withdraw money from a savings goal
@@ -307,11 +455,6 @@ class SavingsService:
             dict: Success status and updated goal or error message
         """
         try:
-            if isinstance(goal_id, str):
-                goal_id = ObjectId(goal_id)
-            if isinstance(user_id, str):
-                user_id = ObjectId(user_id)
-            
             # Validate amount
             is_valid, amount, message = validate_amount(amount)
             if not is_valid:
@@ -320,40 +463,41 @@ class SavingsService:
                     'message': message
                 }
             
-            goal_doc = self.savings_goals.find_one({
-                '_id': goal_id,
-                'user_id': user_id
-            })
+            # Withdraw and reopen the goal in one atomic pipeline update;
+            # the filter rejects insufficient funds
+            goal_doc = self.savings_goals.find_one_and_update(
+                {'_id': goal_id, 'user_id': user_id, 'saved_amount': {'$gte': amount}},
+                [
+                    {'$set': {
+                        'saved_amount': {'$subtract': ['$saved_amount', amount]},
+                        'updated_at': datetime.utcnow()
+                    }},
+                    REACTIVATION_STAGE
+                ],
+                return_document=ReturnDocument.AFTER
+            )
             
             if not goal_doc:
+                # Tell a missing goal apart from insufficient funds
+                if self.savings_goals.find_one({'_id': goal_id, 'user_id': user_id}, {'_id': 1}):
+                    return {
+                        'success': False,
+                        'message': 'Insufficient savings to withdraw'
+                    }
+                
                 return {
                     'success': False,
                     'message': 'Goal not found'
                 }
             
             goal = SavingsGoal.from_mongo(goal_doc)
-            
-            # Check if sufficient funds
-            if amount > goal.saved_amount:
-                return {
-                    'success': False,
-                    'message': 'Insufficient savings to withdraw'
-                }
-            
-            # Withdraw savings
-            new_total = goal.withdraw_savings(amount)
-            
-            # Save to database
-            self.savings_goals.update_one(
-                {'_id': goal_id},
-                {'$set': goal.to_mongo()}
-            )
+            _invalidate_goal(user_id, goal_id)
             
             return {
                 'success': True,
                 'message': f'Withdrew ${amount:.2f} from savings',
                 'goal': goal.to_dict(),
-                'new_total': new_total
+                'new_total': goal.saved_amount
             }
         
         except ValueError as e:
@@ -367,6 +511,7 @@ class SavingsService:
                 'message': f'Failed to withdraw savings: {str(e)}'
             }
     
+    @ensure_object_ids('goal_id', 'user_id')
     def delete_goal(self, goal_id, user_id):
         """
         Delete a savings goal
@@ -379,15 +524,11 @@ class SavingsService:
             dict: Success status or error message
         """
         try:
-            if isinstance(goal_id, str):
-                goal_id = ObjectId(goal_id)
-            if isinstance(user_id, str):
-                user_id = ObjectId(user_id)
-            
             result = self.savings_goals.delete_one({
                 '_id': goal_id,
                 'user_id': user_id
             })
+            _invalidate_goal(user_id, goal_id)
             
             if result.deleted_count > 0:
                 return {
@@ -406,6 +547,107 @@ class SavingsService:
                 'message': f'Failed to delete goal: {str(e)}'
             }
     
+    @ensure_object_ids('user_id')
+    def bulk_update_goals(self, user_id, updates):
+        """
+        Update several savings goals in one round trip
+        
+        Args:
+            user_id: User's MongoDB ObjectId or string
+            updates (list): Dicts with the goal '_id' plus fields to update
+        
+        Returns:
+            dict: Success status and matched/modified counts or error message
+        """
+        try:
+            now = datetime.utcnow()
+            goal_ids = []
+            operations = []
+            for update_data in updates:
+                update_data = dict(update_data)
+                goal_id = update_data.pop('_id')
+                if isinstance(goal_id, str):
+                    goal_id = ObjectId(goal_id)
+                
+                # Validate amounts if provided
+                for field in ('target_amount', 'saved_amount'):
+                    if field in update_data:
+                        is_valid, amount, message = validate_amount(update_data[field])
+                        if not is_valid:
+                            return {
+                                'success': False,
+                                'message': f'Goal {goal_id}: {message}'
+                            }
+                        update_data[field] = amount
+                
+                goal_ids.append(goal_id)
+                operations.append(UpdateOne(
+                    {'_id': goal_id, 'user_id': user_id},
+                    _update_pipeline(SavingsGoal.update_fields(now=now, **update_data), now)
+                ))
+            
+            if not operations:
+                return {
+                    'success': True,
+                    'message': 'No goals to update',
+                    'matched': 0,
+                    'modified': 0
+                }
+            
+            result = self.savings_goals.bulk_write(operations, ordered=False)
+            
+            for goal_id in goal_ids:
+                _invalidate_goal(user_id, goal_id)
+            
+            return {
+                'success': True,
+                'message': f'{result.modified_count} goals updated successfully',
+                'matched': result.matched_count,
+                'modified': result.modified_count
+            }
+        
+        except Exception as e:
+            return {
+                'success': False,
+                'message': f'Failed to update goals: {str(e)}'
+            }
+    
+    @ensure_object_ids('user_id')
+    def bulk_delete_goals(self, user_id, goal_ids):
+        """
+        Delete several savings goals in one round trip
+        
+        Args:
+            user_id: User's MongoDB ObjectId or string
+            goal_ids (list): Goals' MongoDB ObjectIds or strings
+        
+        Returns:
+            dict: Success status and deleted count or error message
+        """
+        try:
+            goal_ids = [ObjectId(goal_id) if isinstance(goal_id, str) else goal_id for goal_id in goal_ids]
+            
+            result = self.savings_goals.delete_many({
+                '_id': {'$in': goal_ids},
+                'user_id': user_id
+            })
+            
+            for goal_id in goal_ids:
+                _invalidate_goal(user_id, goal_id)
+            
+            return {
+                'success': True,
+                'message': f'{result.deleted_count} goals deleted successfully',
+                'deleted': result.deleted_count
+            }
+        
+        except Exception as e:
+            return {
+                'success': False,
+                'message': f'Failed to delete goals: {str(e)}'
+            }
+    
+    @ensure_object_ids('user_id')
     def get_overdue_goals(self, user_id):
         """
         Get goals that are past deadline and not completed
@@ -417,17 +659,13 @@ class SavingsService:
             dict: Overdue goals list
         """
         try:
-            if isinstance(user_id, str):
-                user_id = ObjectId(user_id)
-            
             # Find overdue goals
-            cursor = self.savings_goals.find({
-                'user_id': user_id,
-                'status': 'active',
-                'deadline': {'$lt': datetime.utcnow()}
-            })
+            cursor = self.savings_goals.find(
+                SavingsGoal.overdue_query(user_id), GOAL_LIST_PROJECTION,
+                **query_hint(GOALS_OVERDUE_INDEX)
+            )
             
-            overdue_goals = [SavingsGoal.from_mongo(doc).to_dict() for doc in cursor]
+            overdue_goals = SavingsGoal.docs_to_dicts(cursor, GOAL_LIST_PROJECTION)
             
             return {
                 'success': True,
@@ -2,13 +2,99 @@
 Database connection utility for MongoDB
 """
 
-from pymongo import MongoClient
+from pymongo import MongoClient, IndexModel, ASCENDING, DESCENDING
 from pymongo.errors import ConnectionFailure, ServerSelectionTimeoutError
 import os
+import threading
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Force known-good indexes on report queries; disable while indexes change.
+# Hints only apply once this process has built the indexes, since a hint
+# naming a missing index fails the query.
+USE_HINTS = os.getenv('USE_HINTS', 'True').lower() == 'true'
+
+# Leave index management to operations (e.g. production migrations)
+SKIP_INDEX_BOOTSTRAP = os.getenv('SKIP_INDEX_BOOTSTRAP', 'False').lower() == 'true'
+
+# Let app startup drop LEGACY_INDEXES; off by default so booting a web
+# worker never removes indexes (init_db.py drops them explicitly)
+DROP_LEGACY_INDEXES = os.getenv('DROP_LEGACY_INDEXES', 'False').lower() == 'true'
+
+# Names of indexes that queries hint (see query_hint)
+EXPENSES_USER_DATE_INDEX = 'user_id_1_date_-1'
+EXPENSES_USER_CATEGORY_INDEX = 'esr_user_cat_date_amt'
+# Partial on status 'active'; queries hinting it must filter on that too
+GOALS_OVERDUE_INDEX = 'user_id_1_deadline_1'
+
+# Indexes per collection, created with one create_indexes command each
+INDEX_MODELS = {
+    'users': [
+        IndexModel('email', unique=True),
+        IndexModel('created_at')
+    ],
+    'expenses': [
+        IndexModel([('user_id', ASCENDING), ('date', DESCENDING)], name=EXPENSES_USER_DATE_INDEX),
+        # ESR order (Equality, Sort, Range): equality fields first, then the
+        # date sort, then the amount range, so filtered listings walk the
+        # index in order without examining non-matching documents
+        IndexModel(
+            [('user_id', ASCENDING), ('category', ASCENDING),
+             ('date', DESCENDING), ('amount', ASCENDING)],
+            name=EXPENSES_USER_CATEGORY_INDEX
+        ),
+        IndexModel(
+            [('user_id', ASCENDING), ('payment_type', ASCENDING), ('date', DESCENDING)],
+            name='esr_user_pay_date'
+        ),
+        IndexModel('created_at')
+    ],
+    'expense_stats_monthly': [
+        IndexModel(
+            [('user_id', ASCENDING), ('month', ASCENDING),
+             ('category', ASCENDING), ('payment_type', ASCENDING)],
+            unique=True
+        )
+    ],
+    'categories': [
+        IndexModel([('user_id', ASCENDING), ('name', ASCENDING)], unique=True)
+    ],
+    'alerts': [
+        IndexModel([('user_id', ASCENDING), ('created_at', DESCENDING)]),
+        IndexModel('is_read'),
+        IndexModel('alert_type')
+    ],
+    'savings_goals': [
+        # Equality fields before the deadline range (ESR); the prefix
+        # serves (user_id, status) queries
+        IndexModel([('user_id', ASCENDING), ('status', ASCENDING), ('deadline', ASCENDING)]),
+        # Only active goals can be overdue; keeps the overdue scan small
+        IndexModel(
+            [('user_id', ASCENDING), ('deadline', ASCENDING)],
+            partialFilterExpression={'status': 'active'},
+            name=GOALS_OVERDUE_INDEX
+        )
+    ]
+}
+
+# Indexes replaced by entries in INDEX_MODELS, dropped by
+# Database.drop_legacy_indexes. Every expense and goal query in the app
+# filters on user_id first; the single-field indexes only served
+# unscoped queries, which nothing here issues. Check external readers
+# (reports, ad-hoc scripts) before dropping them.
+LEGACY_INDEXES = {
+    'expenses': [
+        'user_id_1_category_1_date_-1',  # prefix of esr_user_cat_date_amt
+        'category_1',
+        'payment_type_1'
+    ],
+    'savings_goals': [
+        'user_id_1_status_1',  # prefix of user_id_1_status_1_deadline_1
+        'deadline_1'
+    ]
+}
+
 
 class Database:
     """MongoDB database connection manager"""
@@ -16,96 +102,188 @@ class Database:
     _instance = None
     _client = None
     _db = None
+    _read_client = None
+    _read_db = None
+    _indexes_created = False
+    _lock = threading.Lock()
     
     def __new__(cls):
-        """Singleton pattern for database connection"""
+        """Singleton pattern; connects only when the instance is first built"""
+        # Double-checked locking: lock-free once the instance exists
         if cls._instance is None:
-            cls._instance = super(Database, cls).__new__(cls)
+            with cls._lock:
+                if cls._instance is None:
+                    instance = super(Database, cls).__new__(cls)
+                    instance.connect()
+                    cls._instance = instance
         return cls._instance
     
-    def __init__(self):
-        """Initialize database connection"""
-        if self._client is None:
-            self.connect()
+    @staticmethod
+    def _client_options():
+        """MongoClient options shared by the primary and read clients"""
+        # Pool sizes are tunable per deployment
+        return {
+            'serverSelectionTimeoutMS': 5000,
+            'connectTimeoutMS': 10000,
+            'socketTimeoutMS': 10000,
+            'maxPoolSize': int(os.getenv('MONGO_MAX_POOL', 200)),
+            'minPoolSize': int(os.getenv('MONGO_MIN_POOL', 10)),
+            'maxIdleTimeMS': int(os.getenv('MONGO_MAX_IDLE_MS', 300000)),
+            'waitQueueTimeoutMS': int(os.getenv('MONGO_WAIT_QUEUE_TIMEOUT_MS', 5000)),
+            # Wire compression, negotiated per connection in this order;
+            # zlib needs no extra package and is the last resort
+            'compressors': os.getenv('MONGO_COMPRESSORS', 'zstd,snappy,zlib'),
+            'zlibCompressionLevel': int(os.getenv('MONGO_ZLIB_LEVEL', 6))
+        }
     
     def connect(self):
-        """Establish connection to MongoDB"""
+        """
+        Establish connection to MongoDB
+        
+        The client connects lazily. With MONGO_WARMUP the handshake runs
+        here and indexes are bootstrapped once it succeeds; otherwise the
+        bootstrap runs on a background thread so startup does not block.
+        """
+        mongo_uri = os.getenv('MONGO_URI', 'mongodb://localhost:27017/smartbudget')
+        db_name = os.getenv('DB_NAME', 'smartbudget')
+        
         try:
-            mongo_uri = os.getenv('MONGO_URI', 'mongodb://localhost:27017/smartbudget')
-            db_name = os.getenv('DB_NAME', 'smartbudget')
-            
             # Create MongoDB client
             self._client = MongoClient(
                 mongo_uri,
-                serverSelectionTimeoutMS=5000,
-                connectTimeoutMS=10000,
-                socketTimeoutMS=10000
+                retryWrites=True,
+                **self._client_options()
             )
-            
-            # Test connection
-            self._client.server_info()
-            
-            # Get database
-            self._db = self._client[db_name]
-            
-            print(f"✅ Connected to MongoDB: {db_name}")
-            
-            # Create indexes
-            self._create_indexes()
-            
-        except (ConnectionFailure, ServerSelectionTimeoutError) as e:
-            print(f"❌ Failed to connect to MongoDB: {e}")
-            raise
         except Exception as e:
             print(f"❌ Unexpected error connecting to MongoDB: {e}")
             raise
+        
+        # Get database
+        self._db = self._client[db_name]
+        
+        if os.getenv('MONGO_WARMUP', 'False').lower() == 'true':
+            try:
+                self._client.server_info()
+            except (ConnectionFailure, ServerSelectionTimeoutError) as e:
+                print(f"❌ Failed to connect to MongoDB: {e}")
+                raise
+            
+            print(f"✅ Connected to MongoDB: {db_name}")
+            self._create_indexes()
+        else:
+            print(f"✅ MongoDB client ready: {db_name} (connects on first use)")
+            if not (Database._indexes_created or SKIP_INDEX_BOOTSTRAP):
+                threading.Thread(target=self._create_indexes, name='index-bootstrap', daemon=True).start()
     
-    def _create_indexes(self):
-        """Create database indexes for better performance"""
+    def _create_indexes(self, force=False):
+        """
+        Create database indexes for better performance
+        
+        Runs once per process; SKIP_INDEX_BOOTSTRAP disables it where
+        indexes are managed outside the app. force re-runs it regardless.
+        Legacy indexes are only dropped here when DROP_LEGACY_INDEXES is on.
+        """
+        if not force and (Database._indexes_created or SKIP_INDEX_BOOTSTRAP):
+            return
+        
         try:
-            # Users collection indexes
-            self._db.users.create_index('email', unique=True)
-            self._db.users.create_index('created_at')
-            
-            # Expenses collection indexes
-            self._db.expenses.create_index([('user_id', 1), ('date', -1)])
-            self._db.expenses.create_index('category')
-            self._db.expenses.create_index('payment_type')
-            self._db.expenses.create_index('created_at')
-            
-            # Categories collection indexes
-            self._db.categories.create_index([('user_id', 1), ('name', 1)], unique=True)
-            
-            # Alerts collection indexes
-            self._db.alerts.create_index([('user_id', 1), ('created_at', -1)])
-            self._db.alerts.create_index('is_read')
-            self._db.alerts.create_index('alert_type')
-            
-            # Savings goals collection indexes
-            self._db.savings_goals.create_index([('user_id', 1), ('status', 1)])
-            self._db.savings_goals.create_index('deadline')
+            # One create_indexes command per collection
+            for collection_name, index_models in INDEX_MODELS.items():
+                self._db[collection_name].create_indexes(index_models)
             
+            Database._indexes_created = True
             print("✅ Database indexes created")
             
         except Exception as e:
             print(f"⚠️ Warning: Could not create indexes: {e}")
+            return
+        
+        if DROP_LEGACY_INDEXES:
+            self.drop_legacy_indexes()
+    
+    def drop_legacy_indexes(self):
+        """
+        Drop indexes superseded by newer compound indexes
+        
+        Only runs once the replacements in INDEX_MODELS have been built
+        by this process, so queries never lose their index in between.
+        """
+        if not Database._indexes_created:
+            print("⚠️ Warning: Not dropping legacy indexes before new indexes are built")
+            return
+        
+        try:
+            for collection_name, index_names in LEGACY_INDEXES.items():
+                existing = self._db[collection_name].index_information()
+                for index_name in index_names:
+                    if index_name in existing:
+                        self._db[collection_name].drop_index(index_name)
+                        print(f"✅ Dropped legacy index {collection_name}.{index_name}")
+            
+        except Exception as e:
+            print(f"⚠️ Warning: Could not drop legacy indexes: {e}")
     
     def get_db(self):
         """Get database instance"""
         if self._db is None:
-            self.connect()
+            with Database._lock:
+                if self._db is None:
+                    self.connect()
         return self._db
     
     def get_collection(self, collection_name):
         """Get a specific collection"""
         return self._db[collection_name]
     
+    def get_read_client(self):
+        """
+        Get the client used for read-only queries
+        
+        Built lazily and reused. Reads go to secondaries when a replica set
+        has them (MONGO_READ_PREFERENCE), taking load off the primary. Its
+        pool is sized separately (MONGO_READ_MAX_POOL, MONGO_READ_MIN_POOL).
+        """
+        if self._read_client is None:
+            with Database._lock:
+                if self._read_client is None:
+                    mongo_uri = os.getenv('MONGO_URI', 'mongodb://localhost:27017/smartbudget')
+                    db_name = os.getenv('DB_NAME', 'smartbudget')
+                    
+                    # Own, smaller pool: only report queries use this client,
+                    # and sharing the primary's sizes would double the warm
+                    # sockets per process
+                    options = self._client_options()
+                    options['maxPoolSize'] = int(os.getenv('MONGO_READ_MAX_POOL', 50))
+                    options['minPoolSize'] = int(os.getenv('MONGO_READ_MIN_POOL', 0))
+                    
+                    read_client = MongoClient(
+                        mongo_uri,
+                        readPreference=os.getenv('MONGO_READ_PREFERENCE', 'secondaryPreferred'),
+                        readConcernLevel='local',
+                        appname='smartbudget-read',
+                        **options
+                    )
+                    self._read_db = read_client[db_name]
+                    self._read_client = read_client
+        return self._read_client
+    
+    def get_read_collection(self, collection_name):
+        """Get a collection bound to the read client"""
+        self.get_read_client()
+        return self._read_db[collection_name]
+    
     def close(self):
         """Close database connection"""
+        if self._read_client:
+            self._read_client.close()
+            self._read_client = None
+            self._read_db = None
+        
         if self._client:
             self._client.close()
             self._client = None
             self._db = None
+            clear_collection_cache()
             print("✅ MongoDB connection closed")
     
     def ping(self):
@@ -176,9 +354,44 @@ def get_db():
     return db.get_db()
 
 
+_collection_cache = {}
+_read_collection_cache = {}
+_collection_cache_lock = threading.Lock()
+
+
 def get_collection(collection_name):
-    """Helper function to get collection"""
-    return db.get_collection(collection_name)
+    """Helper function to get collection; handles are memoized per connection"""
+    collection = _collection_cache.get(collection_name)
+    if collection is None:
+        with _collection_cache_lock:
+            collection = _collection_cache.get(collection_name)
+            if collection is None:
+                collection = db.get_collection(collection_name)
+                _collection_cache[collection_name] = collection
+    return collection
+
+
+def get_read_collection(collection_name):
+    """Helper function to get collection for read-only queries"""
+    collection = _read_collection_cache.get(collection_name)
+    if collection is None:
+        with _collection_cache_lock:
+            collection = _read_collection_cache.get(collection_name)
+            if collection is None:
+                collection = db.get_read_collection(collection_name)
+                _read_collection_cache[collection_name] = collection
+    return collection
+
+
+def query_hint(index_name):
+    """
+    Keyword arguments that pin a query to an index when USE_HINTS is on
+    
+    Empty until the index bootstrap has finished, including when
+    SKIP_INDEX_BOOTSTRAP leaves it to operations, so queries never hint
+    an index that may not exist yet.
+    """
+    return {'hint': index_name} if USE_HINTS and Database._indexes_created else {}
 
 
 # Collection getters for convenience
@@ -190,6 +403,23 @@ def get_expenses_collection():
     return get_collection('expenses')
 
 
+def get_expense_stats_monthly_collection():
+    return get_collection('expense_stats_monthly')
+
+
+def get_expense_stats_state_collection():
+    return get_collection('expense_stats_state')
+
+
+# Read-only handles for dashboard and report queries
+def get_expenses_read_collection():
+    return get_read_collection('expenses')
+
+
+def get_expense_stats_monthly_read_collection():
+    return get_read_collection('expense_stats_monthly')
+
+
 def get_categories_collection():
     return get_collection('categories')
 
@@ -199,4 +429,10 @@ def get_alerts_collection():
 
 
 def get_savings_goals_collection():
-    return get_collection('savings_goals')
\ No newline at end of file
+    return get_collection('savings_goals')
+
+
+def clear_collection_cache():
+    """Forget memoized collection handles (after the connection closes)"""
+    _collection_cache.clear()
+    _read_collection_cache.clear()
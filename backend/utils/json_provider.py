@@ -0,0 +1,53 @@
+"""
+JSON Provider
+Fast JSON serialization for Flask responses
+"""
+
+from datetime import date, datetime
+from decimal import Decimal
+from bson import ObjectId
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+
+def _default(obj):
+    """Serialize types orjson does not handle natively"""
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, Decimal):
+        return float(obj)
+    raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    JSON provider backed by orjson
+    
+    Encodes response payloads in C instead of walking them with the
+    stdlib json module. Falls back to Flask's default provider when
+    orjson is not installed.
+    """
+    
+    options = 0 if orjson is None else orjson.OPT_NAIVE_UTC | orjson.OPT_SERIALIZE_NUMPY
+    
+    def dumps(self, obj, **kwargs):
+        """Serialize data as JSON"""
+        if orjson is None:
+            return super().dumps(obj, **kwargs)
+        
+        options = self.options
+        if kwargs.get('indent'):
+            options |= orjson.OPT_INDENT_2
+        
+        return orjson.dumps(obj, default=_default, option=options).decode()
+    
+    def loads(self, s, **kwargs):
+        """Deserialize data as JSON"""
+        if orjson is None:
+            return super().loads(s, **kwargs)
+        
+        return orjson.loads(s)
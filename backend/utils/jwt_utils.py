@@ -5,8 +5,9 @@ JWT Utilities - Token generation and validation helpers
 from flask_jwt_extended import create_access_token, create_refresh_token, get_jwt_identity
 from datetime import timedelta
 from functools import wraps
-from flask import jsonify
+from flask import jsonify, g
 from bson import ObjectId
+from backend.utils.db_connection import get_users_collection
 
 
 def generate_tokens(user_id):
@@ -40,11 +41,23 @@ def get_current_user_id():
     """
     Get current authenticated user's ID from JWT token
     
+    The ObjectId is built once per request and kept on flask.g. g lives
+    as long as the app context, which a test or CLI may share across
+    several requests, so clear_current_user_id drops it when each
+    request ends.
+    
     Returns:
         ObjectId: Current user's MongoDB ObjectId
     """
-    user_id = get_jwt_identity()
-    return ObjectId(user_id)
+    user_id = g.get('_current_user_id')
+    if user_id is None:
+        user_id = g._current_user_id = ObjectId(get_jwt_identity())
+    return user_id
+
+
+def clear_current_user_id(exception=None):
+    """Forget the cached user ID; registered as a teardown_request hook"""
+    g.pop('_current_user_id', None)
 
 
 def token_required(f):
@@ -65,22 +78,20 @@ def token_required(f):
 def admin_required(f):
     """
     Decorator to require admin privileges
+    
+    JWT errors are left to the handlers registered on the JWTManager.
     """
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        from utils.db_connection import get_users_collection
+        user = get_users_collection().find_one(
+            {'_id': get_current_user_id()},
+            {'is_admin': 1}
+        )
         
-        try:
-            user_id = get_current_user_id()
-            users = get_users_collection()
-            user = users.find_one({'_id': user_id})
-            
-            if not user or not user.get('is_admin', False):
-                return jsonify({'error': 'Admin access required'}), 403
-            
-            return f(*args, **kwargs)
-        except Exception as e:
-            return jsonify({'error': 'Authorization failed', 'message': str(e)}), 401
+        if not user or not user.get('is_admin', False):
+            return jsonify({'error': 'Admin access required'}), 403
+        
+        return f(*args, **kwargs)
     
     return decorated_function
 
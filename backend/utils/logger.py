@@ -3,29 +3,37 @@ Logging Configuration
 Centralized logging setup for the application
 """
 
+import atexit
 import logging
 import os
-from logging.handlers import RotatingFileHandler, TimedRotatingFileHandler
+import queue
+from logging.handlers import QueueHandler, QueueListener, TimedRotatingFileHandler
 from datetime import datetime
 from pathlib import Path
 from flask import jsonify
 
 
+# Resolved once at import instead of on every setup
+_LOG_DIR = Path(__file__).resolve().parent.parent.parent / 'logs'
+
+
 def setup_logger(app):
     """
     Setup application logger with file and console handlers
     
+    The app logger only enqueues records; a QueueListener thread does the
+    file and console I/O so request threads never block on handler locks.
+    
     Args:
         app: Flask application instance
     """
     # Create logs directory
-    log_dir = Path(__file__).resolve().parent.parent.parent / 'logs'
-    log_dir.mkdir(exist_ok=True)
+    _LOG_DIR.mkdir(exist_ok=True)
     
     # Log file paths
-    log_file = log_dir / 'smartbudget.log'
-    error_log_file = log_dir / 'error.log'
-    access_log_file = log_dir / 'access.log'
+    log_file = _LOG_DIR / 'smartbudget.log'
+    error_log_file = _LOG_DIR / 'error.log'
+    access_log_file = _LOG_DIR / 'access.log'
     
     # Determine log level
     log_level = logging.DEBUG if app.debug else logging.INFO
@@ -41,20 +49,25 @@ def setup_logger(app):
         datefmt='%Y-%m-%d %H:%M:%S'
     )
     
-    # File handler with rotation (10MB max, keep 10 backups)
-    file_handler = RotatingFileHandler(
+    # File handler rotated at UTC midnight (keep 10 days); no size
+    # check on every emit
+    file_handler = TimedRotatingFileHandler(
         log_file,
-        maxBytes=10 * 1024 * 1024,  # 10MB
+        when='midnight',
+        utc=True,
         backupCount=10,
         encoding='utf-8'
     )
-    file_handler.setFormatter(detailed_formatter)
+    # Source locations are only worth the cost while developing
+    development = os.getenv('FLASK_ENV', 'development') == 'development'
+    file_handler.setFormatter(detailed_formatter if development else simple_formatter)
     file_handler.setLevel(logging.INFO)
     
     # Error file handler (only errors and above)
-    error_handler = RotatingFileHandler(
+    error_handler = TimedRotatingFileHandler(
         error_log_file,
-        maxBytes=10 * 1024 * 1024,  # 10MB
+        when='midnight',
+        utc=True,
         backupCount=10,
         encoding='utf-8'
     )
@@ -66,14 +79,31 @@ def setup_logger(app):
     console_handler.setFormatter(simple_formatter)
     console_handler.setLevel(logging.DEBUG if app.debug else logging.INFO)
     
-    # Configure app logger
-    app.logger.addHandler(file_handler)
-    app.logger.addHandler(error_handler)
-    app.logger.addHandler(console_handler)
-    app.logger.setLevel(log_level)
+    # Stop the listener from a previous setup of this app
+    previous_listener = app.extensions.pop('log_listener', None)
+    if previous_listener is not None:
+        atexit.unregister(previous_listener.stop)
+        previous_listener.stop()
     
-    # Remove default Flask logger
-    app.logger.handlers = [file_handler, error_handler, console_handler]
+    # Real handlers run on the listener's background thread
+    log_queue = queue.Queue(-1)
+    listener = QueueListener(
+        log_queue,
+        file_handler,
+        error_handler,
+        console_handler,
+        respect_handler_level=True
+    )
+    listener.start()
+    atexit.register(listener.stop)
+    app.extensions['log_listener'] = listener
+    
+    # Configure app logger; replaces the default Flask handler and keeps
+    # records from being emitted a second time by the root logger
+    app.logger.handlers.clear()
+    app.logger.addHandler(QueueHandler(log_queue))
+    app.logger.propagate = False
+    app.logger.setLevel(log_level)
     
     app.logger.info('=' * 60)
     app.logger.info('SmartBudget Application Started')
@@ -93,14 +123,22 @@ def setup_request_logging(app):
     @app.before_request
     def log_request():
         """Log incoming requests"""
-        from flask import request
-        app.logger.info(f'Request: {request.method} {request.path} from {request.remote_addr}')
+        if app.logger.isEnabledFor(logging.INFO):
+            from flask import request
+            app.logger.info(
+                'Request: %s %s from %s',
+                request.method, request.path, request.remote_addr
+            )
     
     @app.after_request
     def log_response(response):
         """Log outgoing responses"""
-        from flask import request
-        app.logger.info(f'Response: {request.method} {request.path} - {response.status_code}')
+        if app.logger.isEnabledFor(logging.INFO):
+            from flask import request
+            app.logger.info(
+                'Response: %s %s - %s',
+                request.method, request.path, response.status_code
+            )
         return response
 
 
@@ -198,10 +236,19 @@ class RequestLogger:
             )
 
 
+def _preview(value, limit=200):
+    """repr() capped at limit characters, so large documents stay short"""
+    text = repr(value)
+    return text if len(text) <= limit else text[:limit] + '...'
+
+
 def log_function_call(func):
     """
     Decorator to log function calls
     
+    Arguments are only formatted when DEBUG is enabled. Meant for endpoint
+    boundaries, not tight inner helpers.
+    
     Usage:
         @log_function_call
         def my_function(arg1, arg2):
@@ -212,14 +259,20 @@ def log_function_call(func):
     @wraps(func)
     def wrapper(*args, **kwargs):
         logger = get_logger(func.__module__)
-        logger.debug(f'Calling {func.__name__} with args={args}, kwargs={kwargs}')
+        debug = logger.isEnabledFor(logging.DEBUG)
+        if debug:
+            logger.debug(
+                'Calling %s with args=%s, kwargs=%s',
+                func.__name__, _preview(args), _preview(kwargs)
+            )
         
         try:
             result = func(*args, **kwargs)
-            logger.debug(f'{func.__name__} completed successfully')
+            if debug:
+                logger.debug('%s completed successfully', func.__name__)
             return result
         except Exception as e:
-            logger.error(f'{func.__name__} failed: {str(e)}', exc_info=True)
+            logger.error('%s failed: %s', func.__name__, e, exc_info=True)
             raise
     
     return wrapper
@@ -229,6 +282,8 @@ def log_performance(threshold_seconds=1.0):
     """
     Decorator to log slow function calls
     
+    Set DISABLE_PERF_LOG=true to return functions undecorated.
+    
     Args:
         threshold_seconds: Log warning if function takes longer than this
     
@@ -240,18 +295,23 @@ def log_performance(threshold_seconds=1.0):
     from functools import wraps
     import time
     
+    threshold_ns = int(threshold_seconds * 1e9)
+    
     def decorator(func):
+        if os.getenv('DISABLE_PERF_LOG', 'False').lower() == 'true':
+            return func
+        
         @wraps(func)
         def wrapper(*args, **kwargs):
-            logger = get_logger(func.__module__)
-            start_time = time.time()
+            start = time.perf_counter_ns()
             
             result = func(*args, **kwargs)
             
-            duration = time.time() - start_time
-            if duration > threshold_seconds:
-                logger.warning(
-                    f'{func.__name__} took {duration:.2f}s (threshold: {threshold_seconds}s)'
+            duration_ns = time.perf_counter_ns() - start
+            if duration_ns > threshold_ns:
+                get_logger(func.__module__).warning(
+                    '%s took %.2fs (threshold: %ss)',
+                    func.__name__, duration_ns / 1e9, threshold_seconds
                 )
             
             return result
@@ -3,8 +3,55 @@ Validation Utilities - Custom validation functions
 """
 
 import re
-from datetime import datetime
+import string
+import sys
+import inspect
+from datetime import datetime, timezone
+from decimal import Decimal, ROUND_HALF_EVEN
+from functools import lru_cache, wraps
 from bson import ObjectId
+from bson.errors import InvalidId
+from flask import jsonify
+
+
+_EMAIL_RE = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+_WS_RE = re.compile(r'\s+')
+_PHONE_CLEAN_RE = re.compile(r'[\s\-\(\)\.]')
+_PHONE_RE = re.compile(r'^\+?\d{10,15}$')
+
+_CENTS = Decimal('0.01')
+
+_UPPERCASE = frozenset(string.ascii_uppercase)
+_LOWERCASE = frozenset(string.ascii_lowercase)
+_DIGITS = frozenset(string.digits)
+
+if sys.version_info >= (3, 11):
+    # fromisoformat accepts a trailing 'Z' natively from 3.11 on
+    _parse_iso_datetime = datetime.fromisoformat
+else:
+    _ISO_SECONDS_RE = re.compile(r'^(\d{4})-(\d{2})-(\d{2})T(\d{2}):(\d{2}):(\d{2})(Z?)$')
+    
+    def _parse_iso_datetime(value):
+        """Parse ISO 8601, building the common seconds-precision shape directly"""
+        match = _ISO_SECONDS_RE.match(value)
+        if match:
+            *parts, zulu = match.groups()
+            return datetime(*map(int, parts), tzinfo=timezone.utc if zulu else None)
+        if value.endswith('Z'):
+            value = value[:-1] + '+00:00'
+        return datetime.fromisoformat(value)
+
+VALID_CATEGORIES = frozenset({
+    'Food', 'Transport', 'Shopping', 'Bills',
+    'Entertainment', 'Healthcare', 'Other'
+})
+
+VALID_PAYMENT_TYPES = frozenset({
+    'Credit Card', 'Debit Card', 'Cash',
+    'UPI', 'Bank Transfer'
+})
+
+ALLOWED_EXTENSIONS = frozenset({'png', 'jpg', 'jpeg', 'pdf'})
 
 
 def is_valid_email(email):
@@ -17,8 +64,7 @@ def is_valid_email(email):
     Returns:
         bool: True if valid, False otherwise
     """
-    pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-    return bool(re.match(pattern, email))
+    return bool(_EMAIL_RE.match(email))
 
 
 def is_valid_password(password):
@@ -37,13 +83,27 @@ def is_valid_password(password):
     if len(password) < 8:
         return False, "Password must be at least 8 characters"
     
-    if not re.search(r'[A-Z]', password):
+    # Single scan with early exit once every character class is seen
+    has_upper = has_lower = has_digit = False
+    for char in password:
+        if char in _UPPERCASE:
+            has_upper = True
+        elif char in _LOWERCASE:
+            has_lower = True
+        elif char in _DIGITS:
+            has_digit = True
+        else:
+            continue
+        if has_upper and has_lower and has_digit:
+            break
+    
+    if not has_upper:
         return False, "Password must contain at least one uppercase letter"
     
-    if not re.search(r'[a-z]', password):
+    if not has_lower:
         return False, "Password must contain at least one lowercase letter"
     
-    if not re.search(r'\d', password):
+    if not has_digit:
         return False, "Password must contain at least one digit"
     
     return True, "Password is valid"
@@ -53,19 +113,114 @@ def is_valid_object_id(obj_id):
     """
     Check if string is valid MongoDB ObjectId
     
+    Results for strings are memoized, since the same ids are validated
+    repeatedly across requests. Other input (ObjectIds, or lists and
+    dicts from JSON bodies, which cannot be cache keys) is checked
+    directly.
+    
     Args:
         obj_id (str): String to validate
     
     Returns:
         bool: True if valid ObjectId, False otherwise
     """
+    if isinstance(obj_id, str):
+        return _is_valid_object_id_str(obj_id)
+    return _is_valid_object_id(obj_id)
+
+
+@lru_cache(maxsize=4096)
+def _is_valid_object_id_str(obj_id):
+    """is_valid_object_id for strings, memoized"""
+    return _is_valid_object_id(obj_id)
+
+
+def _is_valid_object_id(obj_id):
+    """Whether ObjectId accepts obj_id"""
     try:
         ObjectId(obj_id)
         return True
-    except:
+    except (InvalidId, TypeError):
         return False
 
 
+def requires_object_ids(*param_names):
+    """
+    Route decorator converting URL parameters to ObjectId
+    
+    Services receive ObjectIds and no longer convert ids themselves.
+    
+    Args:
+        *param_names: Names of the route parameters to convert
+    
+    Returns:
+        400 response if any parameter is not a valid ObjectId
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            for name in param_names:
+                if name in kwargs:
+                    if not is_valid_object_id(kwargs[name]):
+                        return jsonify({'error': f'Invalid {name}'}), 400
+                    kwargs[name] = ObjectId(kwargs[name])
+            
+            return f(*args, **kwargs)
+        
+        return decorated_function
+    
+    return decorator
+
+
+@lru_cache(maxsize=4096)
+def _to_object_id(value):
+    """Convert an id string to ObjectId, memoized per string"""
+    return ObjectId(value)
+
+
+def ensure_object_ids(*param_names):
+    """
+    Service decorator converting string id arguments to ObjectId
+    
+    Arguments may be passed positionally or by keyword; values that are
+    already ObjectIds are left alone.
+    
+    Args:
+        *param_names: Names of the method parameters to convert
+    
+    Returns:
+        Failure result dict if any argument is not a valid ObjectId
+    """
+    def decorator(f):
+        positions = {
+            name: index
+            for index, name in enumerate(inspect.signature(f).parameters)
+            if name in param_names
+        }
+        
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            args = list(args)
+            for name, index in positions.items():
+                try:
+                    if index < len(args):
+                        if isinstance(args[index], str):
+                            args[index] = _to_object_id(args[index])
+                    elif isinstance(kwargs.get(name), str):
+                        kwargs[name] = _to_object_id(kwargs[name])
+                except InvalidId:
+                    return {
+                        'success': False,
+                        'message': f'Invalid {name}'
+                    }
+            
+            return f(*args, **kwargs)
+        
+        return decorated_function
+    
+    return decorator
+
+
 def is_valid_date(date_str):
     """
     Validate date string format (ISO 8601)
@@ -76,10 +231,19 @@ def is_valid_date(date_str):
     Returns:
         bool: True if valid date, False otherwise
     """
+    if not isinstance(date_str, str):
+        return False
+    
+    return _is_valid_iso_string(date_str)
+
+
+@lru_cache(maxsize=1024)
+def _is_valid_iso_string(date_str):
+    """Memoized parse check; clients resend the same few dates"""
     try:
-        datetime.fromisoformat(date_str.replace('Z', '+00:00'))
+        _parse_iso_datetime(date_str)
         return True
-    except:
+    except ValueError:
         return False
 
 
@@ -101,7 +265,7 @@ def sanitize_string(text, max_length=None):
     text = text.strip()
     
     # Replace multiple spaces with single space
-    text = re.sub(r'\s+', ' ', text)
+    text = _WS_RE.sub(' ', text)
     
     # Limit length if specified
     if max_length and len(text) > max_length:
@@ -114,6 +278,9 @@ def validate_amount(amount):
     """
     Validate monetary amount
     
+    Numbers (the usual case from parsed JSON) are used directly; strings
+    are rounded through Decimal so no binary-float artifacts are stored.
+    
     Args:
         amount: Amount to validate (can be string or number)
     
@@ -121,7 +288,8 @@ def validate_amount(amount):
         tuple: (is_valid: bool, cleaned_amount: float, message: str)
     """
     try:
-        amount_float = float(amount)
+        is_number = isinstance(amount, (int, float)) and not isinstance(amount, bool)
+        amount_float = amount if is_number else float(amount)
         
         if amount_float <= 0:
             return False, 0, "Amount must be greater than 0"
@@ -130,7 +298,10 @@ def validate_amount(amount):
             return False, 0, "Amount seems unreasonably high"
         
         # Round to 2 decimal places
-        amount_float = round(amount_float, 2)
+        if isinstance(amount, str):
+            amount_float = float(Decimal(amount).quantize(_CENTS, rounding=ROUND_HALF_EVEN))
+        else:
+            amount_float = round(float(amount_float), 2)
         
         return True, amount_float, "Valid amount"
     
@@ -149,10 +320,10 @@ def validate_phone_number(phone):
         bool: True if valid format, False otherwise
     """
     # Remove common separators
-    phone = re.sub(r'[\s\-\(\)\.]', '', phone)
+    phone = _PHONE_CLEAN_RE.sub('', phone)
     
     # Check if only digits and plus sign
-    if not re.match(r'^\+?\d{10,15}$', phone):
+    if not _PHONE_RE.match(phone):
         return False
     
     return True
@@ -201,22 +372,17 @@ def validate_tags(tags, max_tags=10, max_length=20):
     if len(tags) > max_tags:
         return False, [], f"Maximum {max_tags} tags allowed"
     
+    # Clean, skip empty tags and drop duplicates in a single pass
+    seen = set()
     cleaned_tags = []
     for tag in tags:
         if not isinstance(tag, str):
             continue
         
-        # Clean tag
-        tag = sanitize_string(tag, max_length=max_length)
-        
-        # Skip empty tags
-        if not tag:
-            continue
-        
-        cleaned_tags.append(tag.lower())
-    
-    # Remove duplicates while preserving order
-    cleaned_tags = list(dict.fromkeys(cleaned_tags))
+        tag = _WS_RE.sub(' ', tag.strip())[:max_length].lower()
+        if tag and tag not in seen:
+            seen.add(tag)
+            cleaned_tags.append(tag)
     
     return True, cleaned_tags, "Valid tags"
 
@@ -233,10 +399,7 @@ def validate_category(category, valid_categories=None):
         bool: True if valid, False otherwise
     """
     if valid_categories is None:
-        valid_categories = [
-            'Food', 'Transport', 'Shopping', 'Bills',
-            'Entertainment', 'Healthcare', 'Other'
-        ]
+        valid_categories = VALID_CATEGORIES
     
     return category in valid_categories
 
@@ -253,10 +416,7 @@ def validate_payment_type(payment_type, valid_types=None):
         bool: True if valid, False otherwise
     """
     if valid_types is None:
-        valid_types = [
-            'Credit Card', 'Debit Card', 'Cash',
-            'UPI', 'Bank Transfer'
-        ]
+        valid_types = VALID_PAYMENT_TYPES
     
     return payment_type in valid_types
 
@@ -273,7 +433,7 @@ def validate_file_extension(filename, allowed_extensions=None):
         bool: True if valid extension, False otherwise
     """
     if allowed_extensions is None:
-        allowed_extensions = {'png', 'jpg', 'jpeg', 'pdf'}
+        allowed_extensions = ALLOWED_EXTENSIONS
     
     if '.' not in filename:
         return False
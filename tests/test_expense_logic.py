@@ -1,5 +1,4 @@
 # tests/test_expense_logic.py
-import pytest
 from models.expense_model import Expense
 
 
@@ -32,7 +31,7 @@ def test_expense_update_amount_and_notes():
 
     # update amount and notes
     exp.update(amount=25.5, notes="updated note")
-    assert exp.amount == pytest.approx(25.5, rel=1e-6)
+    assert exp.amount == 25.5
     assert exp.notes == "updated note"
 
     # update date with iso string
@@ -74,6 +73,70 @@ def test_to_mongo_and_from_mongo_roundtrip():
     # from_mongo expects created_at/updated_at maybe present; it's okay if not
     new_exp = Expense.from_mongo(sim_doc)
     assert new_exp is not None
-    assert new_exp.amount == pytest.approx(99.99)
+    assert new_exp.amount == 99.99
     assert new_exp.category == "Shopping"
     assert isinstance(new_exp.tags, list)
+
+
+def test_from_mongo_partial_keeps_missing_fields_empty():
+    exp = Expense(
+        user_id="000000000000000000000004",
+        amount=42.0,
+        category="Bills",
+        payment_type="Cash",
+        notes="rent",
+        receipt_url="https://example.com/r.png"
+    )
+
+    mongo_doc = exp.to_mongo()
+    projected = {key: mongo_doc[key] for key in ("_id", "amount", "category", "payment_type", "date", "notes")}
+
+    partial = Expense.from_mongo_partial(projected)
+    d = partial.to_dict()
+    assert d["_id"] == str(exp._id)
+    assert d["amount"] == 42.0
+    assert d["notes"] == "rent"
+    assert d["user_id"] is None
+    assert d["receipt_url"] is None
+    assert d["created_at"] is None
+
+
+def test_docs_to_dicts_matches_model_to_dict():
+    exp = Expense(
+        user_id="000000000000000000000005",
+        amount=12.5,
+        category="Food",
+        payment_type="UPI",
+        notes="lunch",
+        tags=["work"]
+    )
+
+    mongo_doc = exp.to_mongo()
+    assert Expense.docs_to_dicts([mongo_doc]) == [Expense.from_mongo_partial(mongo_doc).to_dict()]
+    assert Expense.docs_to_dicts([mongo_doc])[0] == exp.to_dict()
+
+
+def test_docs_to_dicts_omits_projected_out_fields():
+    exp = Expense(
+        user_id="000000000000000000000005",
+        amount=12.5,
+        category="Food",
+        payment_type="UPI",
+        notes="lunch",
+        tags=["work"]
+    )
+    projection = {"amount": 1, "category": 1, "payment_type": 1, "date": 1, "notes": 1}
+    mongo_doc = {key: value for key, value in exp.to_mongo().items() if key == "_id" or key in projection}
+
+    [row] = Expense.docs_to_dicts([mongo_doc], projection)
+    assert list(row) == ["_id", "amount", "category", "payment_type", "date", "notes"]
+    assert None not in row.values()
+
+
+def test_recent_amounts_pipeline_keeps_latest_window_per_user():
+    user_ids = ["000000000000000000000005", "000000000000000000000006"]
+    match, group = Expense.recent_amounts_pipeline(5, user_ids)
+    assert match == {"$match": {"user_id": {"$in": user_ids}}}
+    assert group["$group"]["_id"] == "$user_id"
+    assert group["$group"]["amounts"]["$topN"] == {"n": 5, "sortBy": {"date": -1}, "output": "$amount"}
+    assert len(Expense.recent_amounts_pipeline()) == 1
@@ -1,20 +1,10 @@
 # tests/test_ml_predictions.py
+import numpy as np
 import pytest
-from statistics import mean
-
-
-def heuristic_predict_last5_avg(history):
-    """
-    Replicates the ml_routes logic: take last up to 5 entries and return average amount.
-    The route uses float(...) on amounts, and returns round(avg,2).
-    """
-    if not isinstance(history, list) or len(history) == 0:
-        raise ValueError("history must be a non-empty list")
-
-    last = history[-5:]
-    amounts = [float(item.get("amount", 0)) for item in last]
-    avg = mean(amounts)
-    return round(avg, 2)
+from ml.prediction import (
+    heuristic_predict_last5_avg, heuristic_predict_last5_avg_arr, batch_predict_last5,
+    windows_from_amounts, RollingMean5
+)
 
 
 def test_predict_with_less_than_five_transactions():
@@ -47,3 +37,64 @@ def test_predict_raises_on_invalid_history():
         heuristic_predict_last5_avg([])
     with pytest.raises(ValueError):
         heuristic_predict_last5_avg("not-a-list")
+
+
+def test_predict_skips_missing_amounts():
+    history = [
+        {"amount": 10},
+        {"note": "pending"},
+        {"amount": 30}
+    ]
+    # missing amounts are ignored instead of pulling the average towards 0
+    assert heuristic_predict_last5_avg(history) == 20.0
+    with pytest.raises(ValueError):
+        heuristic_predict_last5_avg([{"note": "pending"}])
+
+
+def test_predict_rejects_infinite_amounts():
+    history = [{"amount": a} for a in (5, 10, float("inf"), 20, 30)]
+    with pytest.raises(ValueError):
+        heuristic_predict_last5_avg(history)
+    with pytest.raises(ValueError):
+        heuristic_predict_last5_avg([{"amount": "-inf"}])
+
+
+def test_predict_skips_nan_amounts():
+    nan = float("nan")
+    history = [{"amount": a} for a in (5, 10, nan, 20, 30, nan)]
+    # full-length window with NaNs falls back to the skipping path
+    assert heuristic_predict_last5_avg(history) == 20.0
+    with pytest.raises(ValueError):
+        heuristic_predict_last5_avg([{"amount": nan}, {"amount": "nan"}])
+
+
+
+def test_batch_predict_matches_single_predictions():
+    windows = [[7, 9, 11, 13, 100], [10, 10, 10, 10, 10]]
+    preds = batch_predict_last5(windows)
+    assert list(preds) == [heuristic_predict_last5_avg([{"amount": a} for a in row]) for row in windows]
+    with pytest.raises(ValueError):
+        batch_predict_last5([[1, 2, float("nan"), 4, 5]])
+
+
+def test_array_predict_matches_dict_predict():
+    amounts = [5, 7, 9, float("nan"), 13, 100]
+    history = [{"amount": a} for a in amounts]
+    assert heuristic_predict_last5_avg_arr(np.array(amounts)) == heuristic_predict_last5_avg(history)
+    with pytest.raises(ValueError):
+        heuristic_predict_last5_avg_arr(np.array([float("nan")]))
+
+
+def test_rolling_mean_matches_last5_average():
+    amounts = [5, 7, None, 9, 11, float("nan"), 13, 100, 2.5]
+    rolling = RollingMean5()
+    for i, amount in enumerate(amounts, start=1):
+        rolling.push(amount)
+        history = [{"amount": a} for a in amounts[:i] if a is not None and a == a]
+        assert rolling.predict() == heuristic_predict_last5_avg(history)
+
+
+def test_batch_predict_with_short_windows():
+    windows, counts = windows_from_amounts([[100, 13, 11, 9, 7, 5], [30, None, 10], [float("nan")]])
+    assert list(counts) == [5, 2, 0]
+    assert list(batch_predict_last5(windows[:2], counts[:2])) == [28.0, 20.0]
@@ -0,0 +1,59 @@
+# tests/test_savings_logic.py
+from datetime import datetime, timedelta
+from models.savings_model import SavingsGoal
+
+
+def test_docs_to_dicts_matches_model_to_dict():
+    goals = [
+        SavingsGoal(
+            user_id="000000000000000000000001",
+            title="Laptop",
+            target_amount=1200,
+            saved_amount=300,
+            deadline=datetime.utcnow() + timedelta(days=40)
+        ),
+        SavingsGoal(
+            user_id="000000000000000000000001",
+            title="Trip",
+            target_amount=500,
+            saved_amount=100,
+            deadline=datetime.utcnow() - timedelta(days=3)
+        ),
+        SavingsGoal(
+            user_id="000000000000000000000001",
+            title="Phone",
+            target_amount=800,
+            saved_amount=800,
+            status="completed"
+        )
+    ]
+
+    docs = [goal.to_mongo() for goal in goals]
+    assert SavingsGoal.docs_to_dicts(docs) == [SavingsGoal.from_mongo_partial(doc).to_dict() for doc in docs]
+    assert SavingsGoal.docs_to_dicts(docs)[1]["is_overdue"] is True
+
+
+def test_docs_to_dicts_omits_projected_out_fields():
+    goal = SavingsGoal(
+        user_id="000000000000000000000001",
+        title="Laptop",
+        target_amount=1200,
+        saved_amount=300,
+        description="work machine"
+    )
+    projection = {"title": 1, "target_amount": 1, "saved_amount": 1, "deadline": 1, "status": 1}
+    doc = {key: value for key, value in goal.to_mongo().items() if key == "_id" or key in projection}
+
+    [row] = SavingsGoal.docs_to_dicts([doc], projection)
+    assert "description" not in row and "user_id" not in row and "priority" not in row
+    assert row["progress_percent"] == 25.0
+    assert row["remaining_amount"] == 900
+
+
+def test_overdue_query_matches_partial_index_filter():
+    now = datetime.utcnow()
+    query = SavingsGoal.overdue_query("000000000000000000000001", now)
+    # the hinted overdue index is partial on status 'active'
+    assert query["status"] == "active"
+    assert query["deadline"] == {"$lt": now}
+    assert SavingsGoal.overdue_query("000000000000000000000001")["status"] == "active"